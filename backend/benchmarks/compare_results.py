@@ -0,0 +1,62 @@
+"""
+Compare two load test result files written by benchmarks.load_test.
+
+    python -m benchmarks.compare_results benchmarks/results/base.json benchmarks/results/new.json
+
+Exits with status 1 if any latency percentile got slower (or throughput got
+lower) by more than --threshold percent, so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+
+# Metric name -> True if a higher value is better
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+}
+
+
+def compare(baseline, candidate, threshold):
+    regressions = []
+    print(f"{'Endpoint':<12} {'Metric':<16} {'Baseline':>10} {'Candidate':>10} {'Change':>9}")
+    print("-" * 62)
+    for endpoint, base_stats in baseline["endpoints"].items():
+        new_stats = candidate["endpoints"].get(endpoint)
+        if new_stats is None:
+            print(f"{endpoint:<12} missing from candidate run")
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = base_stats[metric], new_stats[metric]
+            change = (new - old) / old * 100 if old else 0.0
+            worse = -change if higher_is_better else change
+            flag = "  <-- regression" if worse > threshold else ""
+            if flag:
+                regressions.append((endpoint, metric, change))
+            print(f"{endpoint:<12} {metric:<16} {old:>10.2f} {new:>10.2f} {change:>+8.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold}%")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Cross-validated evaluation of the crop classifier and the water regressor
+over hyperparameter grids.
+
+Every (configuration, fold) pair is fitted in parallel with joblib. Fold
+splits and fitted models are cached under benchmarks/cache/, keyed by a hash
+of the dataset, the fold settings and the hyperparameters, so re-running with
+a bigger grid only fits the new configurations.
+
+For each configuration the report gives the mean and spread of the score
+across folds (accuracy for crop, MSE and R^2 for water), the single-row
+inference latency (p50/p95, what one API request pays), the per-row cost of
+batch inference, and the pickled model size. Latency is measured after the
+parallel fitting, one configuration at a time, so it isn't skewed by other
+fits competing for the CPU. With --latency-budget-ms, configurations whose
+p95 latency exceeds the budget are dropped from the ranking.
+
+Run from the backend/ folder:
+
+    python -m benchmarks.evaluate_models --task crop --folds 5 --jobs 8 \\
+        --param n_estimators=50,100,200 --param max_depth=none,10,20 --latency-budget-ms 20
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import pickle
+import platform
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.metrics import accuracy_score, mean_squared_error, r2_score
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from benchmarks.load_test import git_revision
+from crop_features import crop_feature_matrix
+from water_advisor import CATEGORICAL_COLUMNS, FEATURES, WATER_DATASET, category_codes, load_water_dataset
+
+CROP_DATASET = "crop-selector/datasets/crop_yield_by_rainfall.csv"
+CACHE_DIR = "benchmarks/cache"
+WATER_TARGETS = ['Water_Use', 'Temperature_Requirement', 'Rainfall_Requirement']
+
+
+def load_crop_data():
+    data = pd.read_csv(CROP_DATASET)
+    X = crop_feature_matrix(data['N'], data['P'], data['K'], data['temperature'], data['ph'], data['rainfall'])
+    return X, data['crop'].to_numpy()
+
+
+def load_water_data():
+    data = load_water_dataset()
+    codes = category_codes(data)
+    for col in CATEGORICAL_COLUMNS:
+        data[col] = data[col].fillna('None').map(codes[col])
+    return data[FEATURES].to_numpy(dtype=float), data[WATER_TARGETS].to_numpy(dtype=float)
+
+
+def crop_model(params, seed):
+    return RandomForestClassifier(random_state=seed, **params)
+
+
+def water_model(params, seed):
+    # make_model.py scales the features before the forest; here the scaler is fitted per fold
+    return make_pipeline(StandardScaler(), RandomForestRegressor(random_state=seed, **params))
+
+
+def crop_scores(model, X, y):
+    return {"accuracy": accuracy_score(y, model.predict(X))}
+
+
+def water_scores(model, X, y):
+    predictions = model.predict(X)
+    return {"mse": mean_squared_error(y, predictions), "r2": r2_score(y, predictions)}
+
+
+# rank_by is the score configurations are sorted on and whether higher is better
+TASKS = {
+    "crop": {
+        "dataset": CROP_DATASET,
+        "load": load_crop_data,
+        "model": crop_model,
+        "score": crop_scores,
+        "splitter": StratifiedKFold,
+        "grid": {"n_estimators": [50, 100, 200], "max_depth": [None, 10, 20]},
+        "rank_by": ("accuracy", True),
+    },
+    "water": {
+        "dataset": WATER_DATASET,
+        "load": load_water_data,
+        "model": water_model,
+        "score": water_scores,
+        "splitter": KFold,
+        "grid": {"n_estimators": [50, 100], "max_depth": [None, 10, 20]},
+        "rank_by": ("mse", False),
+    },
+}
+
+
+def config_hash(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def file_hash(path):
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()[:16]
+
+
+def parse_value(text):
+    if text.lower() == "none":
+        return None
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_grid(params, default):
+    """--param name=v1,v2 options override the task's default grid."""
+    if not params:
+        return default
+    grid = {}
+    for param in params:
+        name, values = param.split("=", 1)
+        grid[name] = [parse_value(value) for value in values.split(",")]
+    return grid
+
+
+def fold_splits(task, X, y, folds, seed, data_hash, cache_dir):
+    path = Path(cache_dir) / "splits" / f"{task}-{config_hash(data_hash, folds, seed)}.npz"
+    if path.exists():
+        saved = np.load(path)
+        return [saved[f"test_{i}"] for i in range(folds)]
+    splitter = TASKS[task]["splitter"](n_splits=folds, shuffle=True, random_state=seed)
+    tests = [test for _, test in splitter.split(X, y)]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(path, **{f"test_{i}": test for i, test in enumerate(tests)})
+    return tests
+
+
+def fit_fold(task, params, fold, test_index, X, y, seed, model_path):
+    """Fit (or load from the cache) one configuration on one fold and score it."""
+    train = np.ones(len(X), dtype=bool)
+    train[test_index] = False
+    if model_path.exists():
+        model, fit_seconds = joblib.load(model_path)
+    else:
+        model = TASKS[task]["model"](params, seed)
+        start = time.perf_counter()
+        model.fit(X[train], y[train])
+        fit_seconds = time.perf_counter() - start
+        model_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so a concurrent run never loads half a file
+        tmp_path = model_path.with_suffix(f".{fold}.tmp")
+        joblib.dump((model, fit_seconds), tmp_path)
+        tmp_path.replace(model_path)
+    return {"fold": fold, "fit_seconds": fit_seconds, **TASKS[task]["score"](model, X[test_index], y[test_index])}
+
+
+def inference_cost(model, X, repeats):
+    """Single-row latency percentiles (ms) and per-row batch cost (us) on the rows of X."""
+    predict = model.predict_proba if hasattr(model, "predict_proba") else model.predict
+    predict(X[:1])
+    latencies = []
+    for i in range(repeats):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        predict(row)
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    predict(X)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "batch_us_per_row": batch_seconds / len(X) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validate model configurations")
+    parser.add_argument("--task", choices=TASKS, default="crop")
+    parser.add_argument("--param", action="append", help="Grid values as name=v1,v2 (repeatable)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel fits (-1: one per CPU)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-repeats", type=int, default=200)
+    parser.add_argument("--latency-budget-ms", type=float, help="Drop configurations whose p95 latency is above this")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--output", default="benchmarks/results/evaluation.json")
+    args = parser.parse_args()
+
+    task = TASKS[args.task]
+    grid = parse_grid(args.param, task["grid"])
+    configs = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    X, y = task["load"]()
+    data_hash = file_hash(task["dataset"])
+    tests = fold_splits(args.task, X, y, args.folds, args.seed, data_hash, args.cache_dir)
+
+    def model_path(params, fold):
+        key = config_hash(args.task, data_hash, args.folds, args.seed, fold, params)
+        return Path(args.cache_dir) / "models" / args.task / f"{key}.joblib"
+
+    jobs = [(params, fold) for params in configs for fold in range(args.folds)]
+    cached = sum(model_path(params, fold).exists() for params, fold in jobs)
+    print(f"{args.task}: {len(configs)} configurations x {args.folds} folds "
+          f"({cached} of {len(jobs)} fits cached), {args.jobs} jobs")
+    start = time.perf_counter()
+    fold_results = Parallel(n_jobs=args.jobs)(
+        delayed(fit_fold)(args.task, params, fold, tests[fold], X, y, args.seed, model_path(params, fold))
+        for params, fold in jobs
+    )
+    print(f"Cross-validation done in {time.perf_counter() - start:.1f}s")
+
+    metric, higher_is_better = task["rank_by"]
+    results = []
+    for i, params in enumerate(configs):
+        folds = fold_results[i * args.folds:(i + 1) * args.folds]
+        # Latency and size are measured on fold 0's model, sequentially
+        model, _ = joblib.load(model_path(params, 0))
+        entry = {
+            "params": params,
+            "folds": folds,
+            "fit_seconds": float(np.mean([f["fit_seconds"] for f in folds])),
+            "model_bytes": len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+            **inference_cost(model, X[tests[0]], args.latency_repeats),
+        }
+        for name in folds[0]:
+            if name not in ("fold", "fit_seconds"):
+                scores = [f[name] for f in folds]
+                entry[name] = float(np.mean(scores))
+                entry[f"{name}_std"] = float(np.std(scores))
+        entry["within_budget"] = args.latency_budget_ms is None or entry["latency_p95_ms"] <= args.latency_budget_ms
+        results.append(entry)
+
+    results.sort(key=lambda entry: entry[metric], reverse=higher_is_better)
+    ranked = [entry for entry in results if entry["within_budget"]]
+    print(f"\n{'params':<45} {metric:>10} {'p50 ms':>8} {'p95 ms':>8} {'us/row':>8} {'size MB':>8}")
+    for entry in results:
+        flag = "" if entry["within_budget"] else "  (over budget)"
+        print(f"{json.dumps(entry['params']):<45} {entry[metric]:>10.4f} {entry['latency_p50_ms']:>8.2f} "
+              f"{entry['latency_p95_ms']:>8.2f} {entry['batch_us_per_row']:>8.1f} "
+              f"{entry['model_bytes'] / 1e6:>8.2f}{flag}")
+    if ranked:
+        print(f"\nBest within budget: {json.dumps(ranked[0]['params'])} ({metric} {ranked[0][metric]:.4f})")
+    else:
+        print("\nNo configuration meets the latency budget")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "task": args.task,
+            "dataset_hash": data_hash,
+            "folds": args.folds,
+            "seed": args.seed,
+            "latency_budget_ms": args.latency_budget_ms,
+            "rank_by": metric,
+        },
+        "configurations": results,
+        "best": ranked[0]["params"] if ranked else None,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Load test and latency benchmark for the backend API.
+
+Run from the backend/ folder:
+
+    python -m benchmarks.load_test --concurrency 8 --requests 500 --output benchmarks/results/run.json
+
+By default the server is started locally with uvicorn in a subprocess. Use
+--in-process to run it in a thread of this process instead (quicker to start,
+but the load generator then shares the GIL with the app), or --url to point
+the benchmark at a server that is already running.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pandas as pd
+
+CROP_DATASET = Path("crop-selector/datasets/crop_yield_by_rainfall.csv")
+LEAF_IMAGES = [Path("disease-plant/leaf.JPG")]
+
+
+def load_crop_payloads(path=CROP_DATASET):
+    """Build /api/crop request bodies from the rows of the rainfall dataset."""
+    data = pd.read_csv(path)
+    columns = ['N', 'P', 'K', 'temperature', 'ph', 'rainfall']
+    return [{col: float(row[col]) for col in columns} for _, row in data.iterrows()]
+
+
+def load_leaf_images(paths=LEAF_IMAGES):
+    """Read the sample leaf images once so uploads don't hit the disk."""
+    return [(path.name, path.read_bytes()) for path in paths]
+
+
+# Each scenario returns a coroutine factory: given a client, send one request
+def crop_scenario(args):
+    payloads = load_crop_payloads()
+
+    def send(client):
+        return client.post("/api/crop", json=random.choice(payloads))
+    return send
+
+
+def disease_scenario(args):
+    images = load_leaf_images([Path(p) for p in args.images] if args.images else LEAF_IMAGES)
+
+    def send(client):
+        name, contents = random.choice(images)
+        return client.post("/api/disease-predict", files={"file": (name, contents, "image/jpeg")})
+    return send
+
+
+def assess_scenario(args):
+    payloads = load_crop_payloads()
+    images = load_leaf_images([Path(p) for p in args.images] if args.images else LEAF_IMAGES)
+
+    def send(client):
+        form = {**random.choice(payloads), "lat": 12.97, "lon": 77.59,
+                "soil_type": "loamy", "irrigation_type": "Drip", "water_crop": "Rice"}
+        name, contents = random.choice(images)
+        return client.post("/api/assess", data=form, files={"file": (name, contents, "image/jpeg")})
+    return send
+
+
+SCENARIOS = {
+    "crop": crop_scenario,
+    "disease": disease_scenario,
+    "assess": assess_scenario,
+}
+
+
+async def run_endpoint(base_url, send, concurrency, total_requests, warmup, timeout):
+    """Drive one endpoint with a closed-loop load of `concurrency` workers."""
+    latencies = []
+    errors = 0
+    remaining = total_requests
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        # Warm up caches, lazy imports and connection pools; not recorded
+        for _ in range(warmup):
+            await send(client)
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    response = await send(client)
+                    ok = response.status_code < 400 and "error" not in response.json()
+                except (httpx.HTTPError, ValueError):
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                if not ok:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "throughput_rps": (len(latencies) - errors) / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "max_ms": float(latencies_ms.max()),
+    }
+
+
+def wait_until_ready(base_url, timeout):
+    # Importing TensorFlow and loading the models can take a while
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/openapi.json", timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not come up within {timeout}s")
+
+
+def start_subprocess_server(host, port):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", host, "--port", str(port),
+         "--log-level", "warning"],
+    )
+
+
+def start_in_process_server(host, port):
+    import uvicorn
+
+    config = uvicorn.Config("server:app", host=host, port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    return server, thread
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crop risk API endpoints")
+    parser.add_argument("--url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--in-process", action="store_true", help="Run the app in a thread of this process")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--endpoints", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="Unrecorded requests per endpoint")
+    parser.add_argument("--images", nargs="+", help="Leaf images for the disease endpoint")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    process = server = None
+    base_url = args.url or f"http://{args.host}:{args.port}"
+    if not args.url:
+        if args.in_process:
+            server, _ = start_in_process_server(args.host, args.port)
+        else:
+            process = start_subprocess_server(args.host, args.port)
+    try:
+        wait_until_ready(base_url, args.startup_timeout)
+
+        results = {}
+        for name in args.endpoints:
+            send = SCENARIOS[name](args)
+            print(f"Benchmarking {name} ({args.requests} requests, concurrency {args.concurrency})...")
+            results[name] = asyncio.run(run_endpoint(
+                base_url, send, args.concurrency, args.requests, args.warmup, args.timeout
+            ))
+            stats = results[name]
+            print(f"  p50 {stats['p50_ms']:.1f} ms | p95 {stats['p95_ms']:.1f} ms | "
+                  f"p99 {stats['p99_ms']:.1f} ms | {stats['throughput_rps']:.1f} req/s | "
+                  f"{stats['errors']} errors")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if server is not None:
+            server.should_exit = True
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "server": "external" if args.url else ("in-process" if args.in_process else "subprocess"),
+            "base_url": base_url,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "endpoints": results,
+    }
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Simplified district boundaries for the web map, built by
+scripts/build_district_boundaries.py.
+
+The pre-gzipped GeoJSON files are small, so all levels are held in memory and
+sent without re-compressing. Clients that don't accept gzip get a decompressed
+copy, made once per level, under its own ETag. A rebuild is picked up when
+manifest.json changes, without restarting the server.
+"""
+import gzip
+import json
+import threading
+from pathlib import Path
+
+
+class DistrictBoundaries:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._levels = None
+        self._plain = {}
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+
+    def available(self):
+        return (self.directory / "manifest.json").exists()
+
+    def _load(self):
+        manifest_path = self.directory / "manifest.json"
+        mtime = manifest_path.stat().st_mtime
+        manifest = json.loads(manifest_path.read_text())
+        self.state = manifest["state"]
+        self._levels = {
+            level["zoom"]: {**level, "gzip": (self.directory / level["file"]).read_bytes()}
+            for level in manifest["levels"]
+        }
+        self._plain = {}
+        self._loaded_mtime = mtime
+
+    def _ensure_loaded(self):
+        # Pick up rebuilt boundaries without restarting the server
+        mtime = (self.directory / "manifest.json").stat().st_mtime
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                if mtime != self._loaded_mtime:
+                    self._load()
+
+    def levels(self):
+        self._ensure_loaded()
+        return sorted(self._levels)
+
+    def level_for(self, zoom):
+        """The most detailed level that is not finer than `zoom` (or the coarsest one)."""
+        levels = self.levels()
+        candidates = [level for level in levels if level <= zoom]
+        return candidates[-1] if candidates else levels[0]
+
+    def etag(self, level, gzipped=False):
+        # The gzip and plain bodies differ, so they can't share a strong ETag
+        suffix = "-gz" if gzipped else ""
+        return f'"{self._levels[level]["etag"]}{suffix}"'
+
+    def gzipped(self, level):
+        return self._levels[level]["gzip"]
+
+    def plain(self, level):
+        if level not in self._plain:
+            self._plain[level] = gzip.decompress(self._levels[level]["gzip"])
+        return self._plain[level]
@@ -0,0 +1,102 @@
+"""
+Uploads for /api/disease-predict/bulk.
+
+A bulk request is either a zip archive sent as the raw request body, or a
+multipart form whose parts are images and/or zip archives. The bytes are
+spooled to temporary files owned by the request (small uploads stay in
+memory, larger ones go to disk), and images are read back one at a time
+while the predictions are streamed, so the archive is never held in memory
+as a whole. Image count and total (uncompressed) bytes are capped before any
+inference starts.
+
+Starlette's form parser spools the whole multipart body before anything here
+sees it, so the server only accepts multipart uploads whose Content-Length is
+within the byte cap. The parts' spooled files are then taken over as they
+are rather than copied again.
+"""
+import io
+import os
+import tempfile
+import zipfile
+
+from starlette.datastructures import UploadFile
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp"}
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+
+class BulkLimitExceeded(Exception):
+    pass
+
+
+def is_image_name(name):
+    base = os.path.basename(name)
+    # Skip macOS resource forks and other hidden files that zip tools add
+    if base.startswith(".") or name.startswith("__MACOSX/"):
+        return False
+    return os.path.splitext(base)[1].lower() in IMAGE_EXTENSIONS
+
+
+class BulkUpload:
+    def __init__(self, max_images, max_bytes):
+        self.max_images = max_images
+        self.max_bytes = max_bytes
+        self.entries = []  # (filename, read) where read() returns the image bytes
+        self.total_bytes = 0
+        self._files = []
+        self._archives = []
+
+    def _spool(self):
+        f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+        self._files.append(f)
+        return f
+
+    def _add(self, filename, size, read):
+        if len(self.entries) >= self.max_images:
+            raise BulkLimitExceeded(f"At most {self.max_images} images can be uploaded at once")
+        self.total_bytes += size
+        if self.total_bytes > self.max_bytes:
+            raise BulkLimitExceeded(f"Images exceed the {self.max_bytes} byte limit")
+        self.entries.append((filename, read))
+
+    def add_zip(self, fileobj):
+        # Sizes come from the central directory and zipfile never reads past them
+        archive = zipfile.ZipFile(fileobj)
+        self._archives.append(archive)
+        for info in archive.infolist():
+            if info.is_dir() or not is_image_name(info.filename):
+                continue
+            self._add(info.filename, info.file_size, lambda info=info: archive.read(info))
+
+    async def add_zip_stream(self, chunks):
+        """Spool a raw zip request body, enforcing the byte cap while it arrives."""
+        f = self._spool()
+        size = 0
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise BulkLimitExceeded(f"Upload exceeds the {self.max_bytes} byte limit")
+            f.write(chunk)
+        f.seek(0)
+        self.add_zip(f)
+
+    def add_form(self, form):
+        """Take ownership of every file part; FastAPI closes the form before the response streams."""
+        for _, part in form.multi_items():
+            if not isinstance(part, UploadFile):
+                continue
+            # Keep the part's own spooled file; the form closes an empty stand-in instead
+            f, part.file = part.file, io.BytesIO()
+            self._files.append(f)
+            f.seek(0)
+            if part.content_type in ZIP_CONTENT_TYPES or (part.filename or "").lower().endswith(".zip"):
+                self.add_zip(f)
+            else:
+                self._add(part.filename or "image", f.seek(0, os.SEEK_END), lambda f=f: (f.seek(0), f.read())[1])
+
+    def close(self):
+        for archive in self._archives:
+            archive.close()
+        for f in self._files:
+            f.close()
@@ -0,0 +1,104 @@
+"""
+Compact, read-only form of a fitted RandomForestClassifier.
+
+scikit-learn keeps every node of every tree as a 64-byte record plus a
+float64 class-count row, which is mostly padding for a 7-feature, depth-10
+crop forest. CompactForest flattens the trees into a few shared arrays:
+
+- feature (int16) and left/right child (int32) per node
+- threshold (float32) per node, rounded down so that `x <= threshold` on
+  float32 inputs gives exactly the same branch as scikit-learn
+- leaf class probabilities quantised to uint16
+
+All trees are walked together, one depth level per numpy step, and
+predict_proba/predict/classes_/n_features_in_ behave like the forest's, so
+the server loads it like any other crop model version (see
+scripts/compact_crop_forest.py).
+"""
+import numpy as np
+
+LEAF_SCALE = 65535
+# Version names of compacted forests end with this (see scripts/compact_crop_forest.py)
+COMPACT_SUFFIX = "-compact"
+# Cap on the (rows x trees x classes) leaf lookups done in one step
+CHUNK_ELEMENTS = 4_000_000
+
+
+class CompactForest:
+    def __init__(self, forest, trees=None):
+        estimators = forest.estimators_ if trees is None else [forest.estimators_[i] for i in trees]
+        self.classes_ = forest.classes_
+        self.n_features_in_ = forest.n_features_in_
+
+        features, thresholds, lefts, rights, leaf_index, leaf_values, roots = [], [], [], [], [], [], []
+        offset = n_leaves = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            is_leaf = tree.children_left < 0
+            roots.append(offset)
+            features.append(np.where(is_leaf, -1, tree.feature))
+            threshold = tree.threshold.astype(np.float32)
+            # Largest float32 not above the float64 threshold keeps float32 comparisons exact
+            rounded_up = threshold.astype(np.float64) > tree.threshold
+            threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+            thresholds.append(threshold)
+            lefts.append(np.where(is_leaf, -1, tree.children_left + offset))
+            rights.append(np.where(is_leaf, -1, tree.children_right + offset))
+
+            values = tree.value[is_leaf, 0, :]
+            probabilities = values / values.sum(axis=1, keepdims=True)
+            leaf_values.append(np.rint(probabilities * LEAF_SCALE).astype(np.uint16))
+            index = np.full(tree.node_count, -1)
+            index[is_leaf] = np.arange(n_leaves, n_leaves + is_leaf.sum())
+            leaf_index.append(index)
+            n_leaves += is_leaf.sum()
+            offset += tree.node_count
+
+        self.feature = np.concatenate(features).astype(np.int16)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts).astype(np.int32)
+        self.right = np.concatenate(rights).astype(np.int32)
+        self.leaf_index = np.concatenate(leaf_index).astype(np.int32)
+        self.leaf_values = np.concatenate(leaf_values)
+        self.roots = np.array(roots, dtype=np.int32)
+        self.max_depth = max(estimator.tree_.max_depth for estimator in estimators)
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def _predict_chunk(self, X):
+        rows = np.arange(len(X))[:, None]
+        nodes = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, np.maximum(feature, 0)] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, self.left[nodes], self.right[nodes]), nodes)
+        totals = self.leaf_values[self.leaf_index[nodes]].sum(axis=1, dtype=np.float64)
+        # Quantised leaves don't sum to exactly LEAF_SCALE, so normalise like the forest does
+        return totals / totals.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, X):
+        # scikit-learn also compares float32 inputs against the thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X must have shape (n, {self.n_features_in_})")
+        chunk = max(1, CHUNK_ELEMENTS // (self.n_estimators * len(self.classes_)))
+        probabilities = np.empty((len(X), len(self.classes_)))
+        for start in range(0, len(X), chunk):
+            probabilities[start:start + chunk] = self._predict_chunk(X[start:start + chunk])
+        return probabilities
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def latest_full_version(slot):
+    """Newest crop version that is still a full forest (compact ones can't be retrained or re-pruned)."""
+    # Imported here so loading a CompactForest only needs numpy
+    from model_registry import LEGACY_VERSION
+    full = [version for version in slot.available_versions() if not version.endswith(COMPACT_SUFFIX)]
+    return full[-1] if full else LEGACY_VERSION
@@ -0,0 +1,60 @@
+"""
+Server settings. Everything is read from environment variables so behaviour
+can be changed per deployment without touching the code.
+"""
+import os
+
+
+def _flag(name, default=False):
+    return os.environ.get(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Allow individual requests to be profiled with the X-Profile header or ?profile= query flag
+PROFILING_ENABLED = _flag("PROFILING_ENABLED")
+# If set, profiled requests must also send this value in the X-Profile-Token header. Fetching
+# a profile from /api/profiles needs it (or the admin token)
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN") or None
+# Profile 1 in N requests with the sampling profiler (0 turns it off)
+PROFILE_SAMPLE_EVERY = int(os.environ.get("PROFILE_SAMPLE_EVERY", "0"))
+# Where profiles and their summaries are stored
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "./profiles")
+# Profiles kept in PROFILE_DIR; older ones are deleted as new ones are saved
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "200"))
+
+# Token required in the X-Admin-Token header by /api/admin endpoints (unset disables them)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN") or None
+# Pin a model version from the versions/ folders instead of serving the newest one
+CROP_MODEL_VERSION = os.environ.get("CROP_MODEL_VERSION") or None
+DISEASE_MODEL_VERSION = os.environ.get("DISEASE_MODEL_VERSION") or None
+# Seconds between checks for new model versions (0 turns the watcher off)
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "0"))
+
+# Limits for /api/disease-predict/bulk
+BULK_MAX_IMAGES = int(os.environ.get("BULK_MAX_IMAGES", "500"))
+BULK_MAX_BYTES = int(os.environ.get("BULK_MAX_BYTES", str(200 * 1024 * 1024)))
+# Images per CNN forward pass in bulk requests
+BULK_BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", "32"))
+
+# SQLite database of the background job queue, shared by the API and `python -m jobs` workers.
+# Keep it on a local disk: the workers have to run on the API host (see jobs.py)
+JOBS_DB = os.environ.get("JOBS_DB", "./jobs.sqlite3")
+# Where job handlers write their output files
+JOBS_DIR = os.environ.get("JOBS_DIR", "./job_outputs")
+
+# Largest rainfall x temperature grid accepted by /api/crop/sensitivity
+SENSITIVITY_MAX_CELLS = int(os.environ.get("SENSITIVITY_MAX_CELLS", "250000"))
+# Grids with more cells than this are streamed as NDJSON instead of one JSON document
+SENSITIVITY_STREAM_CELLS = int(os.environ.get("SENSITIVITY_STREAM_CELLS", "2500"))
+
+# Most points accepted in one /api/rasters/sample request
+RASTER_MAX_POINTS = int(os.environ.get("RASTER_MAX_POINTS", "10000"))
+# Factor from the rainfall raster's values to the rainfall units /api/crop takes (mm, as in
+# crop_yield_by_rainfall.csv). The raster's units aren't recorded in the file, so there is no
+# default: until this is set, /api/crop requires rainfall instead of filling it in from lat/lon.
+# scripts/build_suitability_grid.py uses it too unless given --rainfall-scale.
+RAINFALL_RASTER_SCALE = float(os.environ["RAINFALL_RASTER_SCALE"]) if os.environ.get("RAINFALL_RASTER_SCALE") else None
+
+# Disease model served by default: "teacher" (disease-plant/make_model.py) or "student" (the distilled
+# CNN from scripts/distill_disease_model.py); requests can override it with ?model=
+DISEASE_MODEL = os.environ.get("DISEASE_MODEL", "teacher")
+DISEASE_STUDENT_VERSION = os.environ.get("DISEASE_STUDENT_VERSION") or None
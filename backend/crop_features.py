@@ -0,0 +1,33 @@
+"""
+Input rows for the crop recommendation forest, shared by the server and the
+offline scripts so they always build features the same way.
+
+Rainfall is passed in mm, as in crop_yield_by_rainfall.csv and /api/crop;
+the scaling the forest was trained with is applied here, not by callers.
+"""
+import numpy as np
+
+# Column order the forest was trained with in crop-selector/make_model.py
+FEATURES = ['N', 'P', 'K', 'temperature', 'ph', 'rainfall', 'soil_quality']
+# make_model.py trains on rainfall / 100
+RAINFALL_SCALE = 0.01
+
+
+def calculate_soil_quality(N, P, K):
+    N_norm = N / 100
+    P_norm = P / 100
+    K_norm = K / 100
+    quality = (N_norm * 0.4 + P_norm * 0.3 + K_norm * 0.3) * 100
+    return quality
+
+
+def crop_feature_matrix(N, P, K, temperature, ph, rainfall):
+    """
+    Build a (n, 7) feature matrix. Each argument can be a scalar or an array;
+    scalars are broadcast, so a whole grid of scenarios or raster cells can
+    be scored with a single predict_proba call. Rainfall is in mm.
+    """
+    N, P, K, temperature, ph, rainfall = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (N, P, K, temperature, ph, rainfall))
+    )
+    return np.column_stack([N, P, K, temperature, ph, rainfall * RAINFALL_SCALE, calculate_soil_quality(N, P, K)])
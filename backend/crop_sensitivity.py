@@ -0,0 +1,93 @@
+"""
+Rainfall x temperature sensitivity of the crop recommendation.
+
+For early warnings we want to know how the recommendation for a plot shifts
+if the monsoon fails or temperatures rise. The plot's soil values are held
+fixed while rainfall and temperature sweep a grid of scenarios; the whole
+grid (plus the base plot) is one feature matrix scored with a single
+predict_proba call.
+"""
+import json
+
+import numpy as np
+
+from crop_features import crop_feature_matrix
+
+
+class SensitivityGrid:
+    def __init__(self, model, base, rainfall_values, temperature_values, model_version=None):
+        self.model_version = model_version
+        self.rainfall = np.asarray(rainfall_values, dtype=float)
+        self.temperature = np.asarray(temperature_values, dtype=float)
+        rain, temp = np.meshgrid(self.rainfall, self.temperature, indexing='ij')
+
+        # Grid cells row-major (rainfall, temperature), then the base plot as the last row
+        features = crop_feature_matrix(base.N, base.P, base.K,
+                                       np.append(temp.ravel(), base.temperature), base.ph,
+                                       np.append(rain.ravel(), base.rainfall))
+        probabilities = model.predict_proba(features)
+
+        self.base_probabilities = probabilities[-1]
+        self.probabilities = probabilities[:-1].reshape(len(self.rainfall), len(self.temperature), -1)
+        self.top = self.probabilities.argmax(axis=2)
+        # Crops that score zero everywhere are left out of the surfaces
+        self.crop_indices = np.flatnonzero(self.probabilities.max(axis=(0, 1)) > 0)
+        self.classes = model.classes_
+
+    def header(self):
+        base_top = int(self.base_probabilities.argmax())
+        return {
+            "model_version": self.model_version,
+            "rainfall": self.rainfall.tolist(),
+            "temperature": self.temperature.tolist(),
+            "crops": [str(self.classes[i]) for i in self.crop_indices],
+            "base": {"predicted_crop": str(self.classes[base_top]),
+                     "confidence": float(self.base_probabilities[base_top])},
+        }
+
+    def row(self, i):
+        """Probabilities of each crop along the temperature axis at the i-th rainfall value."""
+        return {
+            "rainfall": float(self.rainfall[i]),
+            "top_crop": [str(self.classes[j]) for j in self.top[i]],
+            "probabilities": {str(self.classes[c]): np.round(self.probabilities[i, :, c], 4).tolist()
+                              for c in self.crop_indices},
+        }
+
+    def surfaces(self):
+        """Probability surface per crop, indexed [rainfall][temperature]."""
+        return {str(self.classes[c]): np.round(self.probabilities[:, :, c], 4).tolist() for c in self.crop_indices}
+
+    def thresholds(self):
+        """
+        Scenario boundaries where the top crop changes, halfway between
+        neighbouring grid values, along each axis with the other one fixed.
+        """
+        changes = []
+        for i, j in zip(*np.nonzero(self.top[1:, :] != self.top[:-1, :])):
+            changes.append({
+                "axis": "rainfall",
+                "temperature": float(self.temperature[j]),
+                "threshold": float((self.rainfall[i] + self.rainfall[i + 1]) / 2),
+                "from_crop": str(self.classes[self.top[i, j]]),
+                "to_crop": str(self.classes[self.top[i + 1, j]]),
+            })
+        for i, j in zip(*np.nonzero(self.top[:, 1:] != self.top[:, :-1])):
+            changes.append({
+                "axis": "temperature",
+                "rainfall": float(self.rainfall[i]),
+                "threshold": float((self.temperature[j] + self.temperature[j + 1]) / 2),
+                "from_crop": str(self.classes[self.top[i, j]]),
+                "to_crop": str(self.classes[self.top[i, j + 1]]),
+            })
+        return changes
+
+    def to_dict(self):
+        return {**self.header(), "probabilities": self.surfaces(), "thresholds": self.thresholds()}
+
+    def ndjson(self):
+        """Stream for large grids: a header line, one line per rainfall value, then the thresholds."""
+        yield json.dumps(self.header()) + "\n"
+        for i in range(len(self.rainfall)):
+            yield json.dumps(self.row(i)) + "\n"
+        yield json.dumps({"thresholds": self.thresholds()}) + "\n"
@@ -0,0 +1,179 @@
+"""
+Handlers for the background job queue (see jobs.py).
+
+Each handler takes a JobContext and returns a JSON-serialisable result.
+Output files go in ctx.output_dir and are listed in the result under
+"outputs" so the API can serve them. Heavy imports happen inside the
+handlers so registering them stays cheap for the API server.
+"""
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from jobs import JobCancelled, handler
+from model_registry import ModelSlot
+
+# Training scripts and the artifact each one writes, relative to its folder
+TRAINING_SCRIPTS = {
+    'crop': ('crop-selector', 'crop_prediction_model.pkl'),
+    'disease': ('disease-plant', 'my_plant_model.h5'),
+    'water': ('water-advisor', 'crop_model.pkl'),
+}
+# Models served from versioned folders by the server (see model_registry.py)
+VERSIONED_MODELS = {'crop', 'disease'}
+
+
+@handler("crop_batch_score")
+def crop_batch_score(ctx):
+    """
+    Score a CSV of plots (columns N, P, K, temperature, ph, rainfall) with the
+    crop forest, chunk by chunk. The number of rows done is checkpointed, so a
+    resumed job appends to the existing output instead of starting over.
+
+    params: input (CSV path), model_version (optional), chunk_size (optional)
+    """
+    import joblib
+    import numpy as np
+    import pandas as pd
+
+    from crop_features import crop_feature_matrix
+
+    chunk_size = int(ctx.params.get("chunk_size", 10_000))
+    slot = ModelSlot('crop', './crop-selector/crop_prediction_model.pkl', '.pkl', loader=None)
+    version = ctx.params.get("model_version") or (ctx.checkpoint or {}).get("model_version") or slot.latest_version()
+    model = joblib.load(slot.path_for(version))['model']
+
+    with open(ctx.params["input"]) as f:
+        total_rows = sum(1 for _ in f) - 1
+    rows_done = (ctx.checkpoint or {}).get("rows_done", 0)
+    output = ctx.output_dir / "scores.csv"
+    if output.exists():
+        # Drop rows written after the last checkpoint by an attempt that died
+        pd.read_csv(output).head(rows_done).to_csv(output, index=False)
+
+    reader = pd.read_csv(ctx.params["input"], chunksize=chunk_size, skiprows=range(1, rows_done + 1))
+    for chunk in reader:
+        features = crop_feature_matrix(chunk['N'], chunk['P'], chunk['K'],
+                                       chunk['temperature'], chunk['ph'], chunk['rainfall'])
+        probabilities = model.predict_proba(features)
+        top = probabilities.argmax(axis=1)
+        chunk = chunk.assign(predicted_crop=model.classes_[top],
+                             confidence=probabilities[np.arange(len(top)), top])
+        # A requeued job's new attempt owns scores.csv now
+        ctx.check()
+        chunk.to_csv(output, mode='a', header=not output.exists(), index=False)
+        rows_done += len(chunk)
+        ctx.progress(rows_done / max(total_rows, 1), f"{rows_done}/{total_rows} rows",
+                     {"rows_done": rows_done, "model_version": version})
+
+    return {"rows": rows_done, "model_version": version, "outputs": [output.name]}
+
+
+def region_info(geometry):
+    """Bounds and centre of a district, as get_region_info in scripts/vis_perfe.py (which needs matplotlib)."""
+    bounds = geometry.bounds
+    center = geometry.centroid
+    return {
+        'min_lon': bounds[0],
+        'min_lat': bounds[1],
+        'max_lon': bounds[2],
+        'max_lat': bounds[3],
+        'center_lon': center.x,
+        'center_lat': center.y,
+    }
+
+
+def district_ndvi_row(idx, row, mean_ndvi, info):
+    """One ndvi_results.csv row, with numpy scalars converted so it can go in a JSON checkpoint."""
+    return {
+        'Region': f'Region_{idx}',
+        'Mean_NDVI': float(mean_ndvi),
+        'Center_Lon': float(info['center_lon']),
+        'Center_Lat': float(info['center_lat']),
+        **{col: (row[col].item() if hasattr(row[col], "item") else row[col])
+           for col in ('NAME_1', 'NAME_2', 'ID_2') if col in row},
+    }
+
+
+@handler("ndvi_districts")
+def ndvi_districts(ctx):
+    """
+    Mean NDVI per district, as in scripts/vis_perfe.py, one district per
+    checkpoint so an interrupted run continues where it stopped.
+
+    params: raster, shapefile (paths), scale (optional, default 0.0001 as in vis_perfe.py)
+    """
+    import geopandas as gpd
+    import numpy as np
+    import pandas as pd
+    import rasterio
+    import rasterio.mask
+
+    scale = float(ctx.params.get("scale", 0.0001))
+    checkpoint = ctx.checkpoint or {"next_index": 0, "results": []}
+    results = checkpoint["results"]
+
+    regions = gpd.read_file(ctx.params["shapefile"])
+    with rasterio.open(ctx.params["raster"]) as src:
+        regions = regions.to_crs(src.crs)
+        bounds = src.bounds
+        overlapping = regions.cx[bounds.left:bounds.right, bounds.bottom:bounds.top]
+
+        for position in range(checkpoint["next_index"], len(overlapping)):
+            idx, row = overlapping.index[position], overlapping.iloc[position]
+            try:
+                out_image, _ = rasterio.mask.mask(src, [row['geometry']], crop=True)
+                masked_data = out_image[0]
+                if src.nodata is not None:
+                    masked_data = np.ma.masked_equal(masked_data, src.nodata)
+                masked_data = masked_data * scale
+                masked_data = np.ma.masked_outside(masked_data, -1, 1)
+                if out_image.size and not masked_data.mask.all():
+                    results.append(district_ndvi_row(idx, row, masked_data.mean(),
+                                                     region_info(row['geometry'])))
+            except ValueError:
+                # rasterio raises ValueError for shapes that don't overlap the raster
+                pass
+            ctx.progress((position + 1) / len(overlapping), f"{position + 1}/{len(overlapping)} districts",
+                         {"next_index": position + 1, "results": results})
+
+    output = ctx.output_dir / "ndvi_results.csv"
+    pd.DataFrame(results).sort_values('Mean_NDVI', ascending=False).to_csv(output, index=False)
+    return {"districts": len(results), "outputs": [output.name]}
+
+
+@handler("retrain")
+def retrain(ctx):
+    """
+    Run a model's make_model.py. Crop and disease artifacts are then copied
+    into their versions/ folder, so a server with MODEL_WATCH_INTERVAL set
+    (or an admin reload) picks the new version up without a restart.
+
+    params: model ('crop', 'disease' or 'water')
+    """
+    model = ctx.params["model"]
+    folder, artifact = TRAINING_SCRIPTS[model]
+    log_path = ctx.output_dir / "training.log"
+
+    # Training has no natural checkpoints; a resumed job simply trains again
+    with open(log_path, "w") as log:
+        process = subprocess.Popen([sys.executable, "make_model.py"], cwd=folder, stdout=log, stderr=subprocess.STDOUT)
+        while process.poll() is None:
+            if ctx.cancelled():
+                process.terminate()
+                process.wait()
+                raise JobCancelled()
+            time.sleep(1)
+    if process.returncode != 0:
+        raise RuntimeError(f"make_model.py exited with {process.returncode}, see training.log")
+
+    result = {"model": model, "outputs": [log_path.name]}
+    if model in VERSIONED_MODELS:
+        source = Path(folder) / artifact
+        version = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        slot = ModelSlot(model, source, source.suffix, loader=None)
+        slot.publish(version, lambda path: shutil.copy2(source, path))
+        result["version"] = version
+    return result
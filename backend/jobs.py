@@ -0,0 +1,312 @@
+"""
+Persistent job queue for long-running work: NDVI processing, model
+retraining and large batch scoring.
+
+Jobs are rows in a SQLite database (JOBS_DB), so they survive restarts and
+can be shared by several worker processes. The API only submits and reads
+jobs; the work runs in separate worker processes:
+
+    python -m jobs --workers 4
+
+Workers must run on the same host as the API, with JOBS_DB on a local disk.
+The database is in WAL mode, which relies on shared memory between the
+processes using it and doesn't work over a network filesystem, so batch nodes
+can't share the queue by mounting the file.
+
+Handlers get a JobContext. They report progress and save a checkpoint after
+each unit of work, and `ctx.progress()` raises JobCancelled once a cancel has
+been requested. A job whose worker stopped sending heartbeats is put back in
+the queue and picks up from its last checkpoint, and failed or cancelled jobs
+can be resumed from theirs the same way (JobQueue.resume). Updates from a worker are
+only applied while it still owns the job, so one that was presumed dead can't
+overwrite the attempt that replaced it; it is stopped like a cancelled job.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import config
+
+STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+HEARTBEAT_SECONDS = 10
+STALE_AFTER_SECONDS = 120
+POLL_SECONDS = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    checkpoint TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def handler(kind):
+    """Register a function as the handler for a job kind."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+class JobQueue:
+    def __init__(self, path=config.JOBS_DB):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            # WAL lets the API read job status while workers write (same host only)
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        for key in ("params", "checkpoint", "result"):
+            job[key] = json.loads(job[key]) if job[key] is not None else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def submit(self, kind, params):
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, kind, json.dumps(params), time.time()),
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            return self._row_to_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, status=None, limit=50):
+        query = "SELECT * FROM jobs"
+        args = []
+        if status:
+            query += " WHERE status = ?"
+            args.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._connect() as conn:
+            return [self._row_to_dict(row) for row in conn.execute(query, args)]
+
+    def cancel(self, job_id):
+        """Cancel a queued job immediately, or ask the worker to stop a running one."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (now, job_id),
+            )
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    def resume(self, job_id):
+        """Queue a failed or cancelled job again; it continues from its last checkpoint."""
+        with self._connect() as conn:
+            resumed = conn.execute(
+                "UPDATE jobs SET status = 'queued', cancel_requested = 0, worker = NULL, error = NULL, "
+                "finished_at = NULL WHERE id = ? AND status IN ('failed', 'cancelled')",
+                (job_id,),
+            ).rowcount
+        return bool(resumed)
+
+    def claim(self, worker):
+        """Atomically take the oldest queued job, or return None."""
+        now = time.time()
+        with self._connect() as conn:
+            # Take the write lock before reading so two workers can't claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                        "started_at = COALESCE(started_at, ?), heartbeat_at = ? WHERE id = ?",
+                        (worker, now, now, row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return self.get(row["id"])
+
+    def requeue_stale(self, stale_after=STALE_AFTER_SECONDS):
+        """Put running jobs whose worker died back in the queue; they resume from their checkpoint."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN cancel_requested THEN 'cancelled' ELSE 'queued' END, "
+                "worker = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                (time.time() - stale_after,),
+            )
+
+    def heartbeat(self, job_id, worker, progress=None, message=None, checkpoint=None):
+        """
+        Record liveness (and optionally progress). Returns True if the worker
+        should stop: a cancel was requested, or the job is no longer its own.
+        """
+        sets = ["heartbeat_at = ?"]
+        args = [time.time()]
+        if progress is not None:
+            sets.append("progress = ?")
+            args.append(progress)
+        if message is not None:
+            sets.append("message = ?")
+            args.append(message)
+        if checkpoint is not None:
+            sets.append("checkpoint = ?")
+            args.append(json.dumps(checkpoint))
+        with self._connect() as conn:
+            updated = conn.execute(
+                f"UPDATE jobs SET {', '.join(sets)} WHERE id = ? AND worker = ? AND status = 'running'",
+                (*args, job_id, worker),
+            ).rowcount
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return not updated or bool(row["cancel_requested"])
+
+    def finish(self, job_id, worker, status, result=None, error=None):
+        """Record the outcome, unless the job was requeued and `worker` no longer owns it."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+                "progress = CASE WHEN ? = 'succeeded' THEN 1 ELSE progress END "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), status,
+                 job_id, worker),
+            )
+
+
+class JobContext:
+    def __init__(self, queue, job):
+        self.queue = queue
+        self.job_id = job["id"]
+        self.worker = job["worker"]
+        self.params = job["params"]
+        # Saved by a previous attempt, or None on the first run
+        self.checkpoint = job["checkpoint"]
+        self.output_dir = Path(config.JOBS_DIR) / self.job_id
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._cancelled = threading.Event()
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        # Keeps the job alive during long steps that don't report progress
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            if self.queue.heartbeat(self.job_id, self.worker):
+                self._cancelled.set()
+
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Raise JobCancelled if the job was cancelled or taken over, e.g. before writing output."""
+        if self.cancelled():
+            raise JobCancelled()
+
+    def progress(self, fraction, message=None, checkpoint=None):
+        if self.queue.heartbeat(self.job_id, self.worker, fraction, message, checkpoint):
+            self._cancelled.set()
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+        self.check()
+
+    def __enter__(self):
+        self._heartbeat.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._heartbeat.join()
+
+
+def run_job(queue, job):
+    try:
+        with JobContext(queue, job) as ctx:
+            result = HANDLERS[job["kind"]](ctx)
+        queue.finish(job["id"], job["worker"], "succeeded", result=result)
+    except JobCancelled:
+        queue.finish(job["id"], job["worker"], "cancelled")
+    except Exception as e:
+        queue.finish(job["id"], job["worker"], "failed", error=f"{type(e).__name__}: {e}")
+
+
+def worker_loop(db_path, worker_name):
+    # Handlers live in job_handlers.py; importing it registers them
+    import job_handlers  # noqa: F401
+
+    queue = JobQueue(db_path)
+    print(f"[{worker_name}] waiting for jobs")
+    while True:
+        queue.requeue_stale()
+        job = queue.claim(worker_name)
+        if job is None:
+            time.sleep(POLL_SECONDS)
+            continue
+        print(f"[{worker_name}] running {job['kind']} job {job['id']} (attempt {job['attempts']})")
+        run_job(queue, job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run job queue workers")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--db", default=config.JOBS_DB)
+    args = parser.parse_args()
+
+    host = socket.gethostname()
+    processes = [
+        multiprocessing.Process(target=worker_loop, args=(args.db, f"{host}:{os.getpid()}:{i}"), daemon=True)
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
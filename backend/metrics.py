@@ -0,0 +1,126 @@
+"""
+Prometheus metrics for the API server.
+
+Request latency is recorded by MetricsMiddleware for every route, and the
+endpoints add finer grained timings with the `stage` context manager, e.g.
+
+    with stage("/api/disease-predict", "decode"):
+        img = image.load_img(...)
+
+Everything is exported in the Prometheus text format on /metrics.
+"""
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.routing import Match
+
+# Model inference is in the millisecond range, uploads and TF cold starts can take seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds",
+    "End-to-end request latency per endpoint",
+    ["endpoint", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "api_stage_duration_seconds",
+    "Latency of individual processing stages per endpoint",
+    ["endpoint", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "api_requests_in_flight",
+    "Requests currently being processed",
+)
+ERRORS = Counter(
+    "api_request_errors_total",
+    "Failed requests per endpoint, by HTTP status, 'exception' or 'error_response'",
+    ["endpoint", "reason"],
+)
+MODEL_LOAD_SECONDS = Gauge(
+    "model_load_duration_seconds",
+    "Time taken to load each model from disk",
+    ["model"],
+)
+MODEL_VERSION = Gauge(
+    "model_version_info",
+    "Model version currently being served (value is always 1)",
+    ["model", "version"],
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+@contextmanager
+def stage(endpoint, name):
+    """Time a block of code as one stage of an endpoint."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(endpoint, name).observe(time.perf_counter() - start)
+
+
+def timed_load(model_name, loader, *args, **kwargs):
+    """Call `loader` and record how long it took under `model_name`."""
+    start = time.perf_counter()
+    model = loader(*args, **kwargs)
+    MODEL_LOAD_SECONDS.labels(model_name).set(time.perf_counter() - start)
+    return model
+
+
+def export():
+    return generate_latest()
+
+
+def route_template(app, scope):
+    """Map a request to its route path (e.g. /api/crop) to keep label cardinality bounded."""
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (rather than BaseHTTPMiddleware) so the per-request
+    cost stays at a couple of perf_counter calls and streamed responses are
+    not buffered.
+    """
+
+    def __init__(self, app, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        failed = False
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            IN_FLIGHT.dec()
+            endpoint = route_template(scope["app"], scope)
+            REQUEST_LATENCY.labels(endpoint, scope["method"]).observe(time.perf_counter() - start)
+            if failed:
+                ERRORS.labels(endpoint, "exception").inc()
+            elif status >= 400:
+                ERRORS.labels(endpoint, str(status)).inc()
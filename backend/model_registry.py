@@ -0,0 +1,177 @@
+"""
+Versioned model artifacts with zero-downtime hot reload.
+
+Each model keeps its versions in a `versions/` folder next to the original
+artifact, one file per version:
+
+    crop-selector/versions/<version>.pkl
+    disease-plant/versions/<version>.h5
+
+Version names are expected to sort in release order (the training scripts use
+UTC timestamps like 20261019T120000). The newest version is served unless one
+is pinned; with no versions folder the original file (crop_prediction_model.pkl,
+my_plant_model.h5) is served as version "legacy".
+
+A reload loads and warms up the new version in a background thread while the
+old one keeps serving, then swaps the reference in one assignment. Request
+handlers read `slot.current` once at the start, so in-flight requests finish
+on the version they started with.
+
+Writers must publish new versions with `ModelSlot.publish`, which writes
+under a temporary name and moves the finished file into place in one step,
+so the watcher never loads a half-written artifact.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import metrics
+
+LEGACY_VERSION = "legacy"
+
+
+class LoadedModel(NamedTuple):
+    version: str
+    model: Any
+    loaded_at: float
+    load_seconds: float
+
+
+class ModelSlot:
+    def __init__(self, name, legacy_path, suffix, loader, warmup=None, pinned_version=None):
+        self.name = name
+        self.legacy_path = Path(legacy_path)
+        self.versions_dir = self.legacy_path.parent / "versions"
+        self.suffix = suffix
+        self.loader = loader
+        self.warmup = warmup
+        self.pinned_version = pinned_version
+        self.current = None
+        self.reloading = None
+        self.last_error = None
+        # (version, file signature) of the last failed load, so the watcher retries only once the file changes
+        self._failed = None
+        self._reload_lock = threading.Lock()
+
+    def available_versions(self):
+        if not self.versions_dir.is_dir():
+            return []
+        return sorted(path.stem for path in self.versions_dir.glob(f"*{self.suffix}"))
+
+    def latest_version(self):
+        versions = self.available_versions()
+        return versions[-1] if versions else LEGACY_VERSION
+
+    def path_for(self, version):
+        if version == LEGACY_VERSION:
+            return self.legacy_path
+        path = self.versions_dir / f"{version}{self.suffix}"
+        # Versions come from admin requests, so don't let them point outside the folder
+        if path.parent != self.versions_dir or not path.exists():
+            raise FileNotFoundError(f"Unknown {self.name} model version '{version}'")
+        return path
+
+    def publish(self, version, write):
+        """
+        Add a new version atomically. `write(path)` saves the artifact to a
+        staging path (same suffix, in versions/.staging/, which is never
+        listed as a version), then it is renamed into versions/.
+        """
+        staging_dir = self.versions_dir / ".staging"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        staging_path = staging_dir / f"{version}.{os.getpid()}{self.suffix}"
+        try:
+            write(staging_path)
+            target = self.versions_dir / f"{version}{self.suffix}"
+            os.replace(staging_path, target)
+        finally:
+            staging_path.unlink(missing_ok=True)
+        return target
+
+    def _signature(self, version):
+        try:
+            stat = self.path_for(version).stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, version):
+        path = self.path_for(version)
+        start = time.perf_counter()
+        model = self.loader(path)
+        if self.warmup is not None:
+            # Pay one-off costs (graph tracing, lazy allocations) before taking traffic
+            self.warmup(model)
+        load_seconds = time.perf_counter() - start
+        metrics.MODEL_LOAD_SECONDS.labels(self.name).set(load_seconds)
+        return LoadedModel(version, model, time.time(), load_seconds)
+
+    def reload(self, version=None):
+        """Load `version` (default: pinned or newest) and swap it in. Blocks until done."""
+        with self._reload_lock:
+            version = version or self.pinned_version or self.latest_version()
+            self.reloading = version
+            signature = self._signature(version)
+            try:
+                loaded = self._load(version)
+            except Exception as e:
+                self.last_error = f"{version}: {e}"
+                self._failed = (version, signature)
+                raise
+            finally:
+                self.reloading = None
+            previous = self.current
+            self.current = loaded
+            self.last_error = None
+            self._failed = None
+            if previous is not None and previous.version != loaded.version:
+                metrics.MODEL_VERSION.remove(self.name, previous.version)
+            metrics.MODEL_VERSION.labels(self.name, loaded.version).set(1)
+            return loaded
+
+    def reload_in_background(self, version=None):
+        # Validate the request up front so the caller gets an error instead of a silent failure
+        if version is not None:
+            self.path_for(version)
+        thread = threading.Thread(target=self._reload_quietly, args=(version,),
+                                  name=f"reload-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def _reload_quietly(self, version):
+        try:
+            self.reload(version)
+        except Exception:
+            # Keep serving the current version; the error is reported by status()
+            pass
+
+    def watch(self, interval):
+        """Poll the versions folder and hot reload when a newer version appears."""
+        def poll():
+            while True:
+                time.sleep(interval)
+                if self.pinned_version or self._reload_lock.locked():
+                    continue
+                latest = self.latest_version()
+                if self.current is None or latest != self.current.version:
+                    if self._failed == (latest, self._signature(latest)):
+                        continue  # don't retry a broken artifact until it is rewritten
+                    self._reload_quietly(latest)
+
+        thread = threading.Thread(target=poll, name=f"watch-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        current = self.current
+        return {
+            "version": current.version if current else None,
+            "loaded_at": current.loaded_at if current else None,
+            "load_seconds": current.load_seconds if current else None,
+            "pinned_version": self.pinned_version,
+            "reloading": self.reloading,
+            "last_error": self.last_error,
+            "available_versions": self.available_versions(),
+        }
@@ -0,0 +1,242 @@
+"""
+On-demand per-request profiling.
+
+When PROFILING_ENABLED is set, a request can ask to be profiled with
+
+    X-Profile: cprofile | sample      (header)
+    ?profile=cprofile | sample        (query string)
+
+plus the X-Profile-Token header if PROFILING_TOKEN is configured. With
+PROFILE_SAMPLE_EVERY=N, 1 in N requests is also profiled with the sampler.
+
+Two profilers are available:
+
+- cprofile: deterministic, but only sees the event loop thread. Use it for
+  async endpoints such as /api/disease-predict.
+- sample: a stack sampler over all threads, so it also covers sync endpoints
+  like /api/crop that FastAPI runs in its threadpool. Idle threads are
+  skipped, but other requests running at the same time will show up too.
+
+The profile is stored in PROFILE_DIR (.pstats or collapsed stacks, which
+flamegraph.pl and speedscope read directly) next to a JSON summary of the
+hottest functions. Only the newest PROFILE_KEEP profiles are kept. Summaries
+and files are written from a worker thread, after the response, so the event
+loop isn't held up.
+
+A profile can contain stacks of other requests running at the same time, so
+fetching one from /api/profiles/{id} needs PROFILING_TOKEN or the admin
+token. Only requests that asked to be profiled get their id back in
+X-Profile-Id; requests picked by PROFILE_SAMPLE_EVERY don't.
+"""
+import cProfile
+import itertools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+
+PROFILERS = ("cprofile", "sample")
+TOP_N = 25
+
+# Leaf frames of threads that are just waiting for work
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+
+class StackSampler:
+    """Periodically records the Python stack of every thread as collapsed stacks."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if leaf in IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+    def summary(self):
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.counts.items():
+            frames = stack.split(";")[1:]
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "top_self": [{"function": f, "samples": c} for f, c in self_counts.most_common(TOP_N)],
+            "top_total": [{"function": f, "samples": c} for f, c in total_counts.most_common(TOP_N)],
+        }
+
+
+def cprofile_summary(profiler):
+    stats = pstats.Stats(profiler)
+    rows = [
+        {
+            "function": f"{func} ({os.path.basename(filename)}:{line})",
+            "calls": nc,
+            "self_s": tt,
+            "total_s": ct,
+        }
+        for (filename, line, func), (cc, nc, tt, ct, callers) in stats.stats.items()
+    ]
+    return {
+        "top_self": sorted(rows, key=lambda r: r["self_s"], reverse=True)[:TOP_N],
+        "top_total": sorted(rows, key=lambda r: r["total_s"], reverse=True)[:TOP_N],
+    }
+
+
+class ProfileStore:
+    def __init__(self, directory, keep=200):
+        self.directory = Path(directory)
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def save(self, profile_id, kind, request_info, duration, raw):
+        """Write the raw profile and its summary, then drop the oldest beyond `keep`."""
+        summary = cprofile_summary(raw) if kind == "cprofile" else raw.summary()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if kind == "cprofile":
+            raw_path = self.directory / f"{profile_id}.pstats"
+            raw.dump_stats(raw_path)
+        else:
+            raw_path = self.directory / f"{profile_id}.collapsed"
+            raw_path.write_text(raw.collapsed())
+        document = {
+            "id": profile_id,
+            "profiler": kind,
+            **request_info,
+            "duration_ms": duration * 1000,
+            "raw_file": raw_path.name,
+            **summary,
+        }
+        (self.directory / f"{profile_id}.json").write_text(json.dumps(document, indent=2))
+        self.prune()
+
+    def prune(self):
+        with self._lock:
+            summaries = sorted(self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime)
+            for path in summaries[:max(0, len(summaries) - self.keep)]:
+                for suffix in (".json", ".pstats", ".collapsed"):
+                    path.with_suffix(suffix).unlink(missing_ok=True)
+
+    def _path(self, profile_id, suffix):
+        # Ids are generated by us; anything else is rejected to keep lookups inside the directory
+        if not all(c in "0123456789abcdef" for c in profile_id):
+            return None
+        path = self.directory / f"{profile_id}{suffix}"
+        return path if path.exists() else None
+
+    def summary_path(self, profile_id):
+        return self._path(profile_id, ".json")
+
+    def raw_path(self, profile_id):
+        return self._path(profile_id, ".pstats") or self._path(profile_id, ".collapsed")
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, store, enabled=False, token=None, sample_every=0):
+        self.app = app
+        self.store = store
+        self.enabled = enabled
+        self.token = token
+        self.sample_every = sample_every
+        self._counter = itertools.count(1)
+        # cProfile hooks the whole event loop thread, so only one request can use it at a time
+        self._cprofile_busy = False
+
+    def _requested_profiler(self, scope):
+        headers = dict(scope["headers"])
+        requested = headers.get(b"x-profile", b"").decode()
+        if not requested:
+            query = parse_qs(scope.get("query_string", b"").decode())
+            requested = query.get("profile", [""])[0]
+        if not requested:
+            return None
+        if self.token is not None and headers.get(b"x-profile-token", b"").decode() != self.token:
+            return None
+        return requested if requested in PROFILERS else "cprofile"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        kind = self._requested_profiler(scope) if self.enabled else None
+        # Only callers who asked for a profile are told its id
+        requested = kind is not None
+        if kind is None and self.sample_every and next(self._counter) % self.sample_every == 0:
+            kind = "sample"
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+        if kind == "cprofile" and self._cprofile_busy:
+            kind = "sample"
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and requested:
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        if kind == "cprofile":
+            self._cprofile_busy = True
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler()
+            profiler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            if kind == "cprofile":
+                profiler.disable()
+                self._cprofile_busy = False
+            else:
+                profiler.stop()
+            request_info = {"method": scope["method"], "path": scope["path"], "timestamp": time.time()}
+            # Summarising and writing take long enough to stall other requests on the event loop
+            await run_in_threadpool(self.store.save, profile_id, kind, request_info, duration, profiler)
@@ -0,0 +1,167 @@
+"""
+Point sampling of the rasters in datasets_ndvi/ (rainfall and NDVI).
+
+The GeoTIFFs are LZW-compressed and tiled, so they can't be memory-mapped
+as they are. Each band is decoded once into a plain .npy file under
+datasets_ndvi/mmap/ (named after the source's mtime and size, so an updated
+raster is decoded again) and opened with np.load(mmap_mode='r'). Every
+worker process then shares the same pages through the OS page cache.
+
+Lon/lat points are turned into fractional pixel positions with the inverse
+geotransform for the whole batch at once, and read with nearest or bilinear
+interpolation. Recently sampled points are cached per raster and method.
+
+A raster that doesn't declare a nodata value can be given one in NODATA;
+those pixels become NaN like declared nodata, so they read as "no data"
+rather than as a real value.
+"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import rasterio
+
+RASTERS = {
+    'rainfall': 'datasets_ndvi/rainfall_buffered_karnataka.tif',
+    'ndvi': 'datasets_ndvi/NDVI_Export.tif',
+}
+# Nodata values for rasters whose files don't set one. The rainfall raster
+# fills everything outside its buffer with 0 (real cells are well above 0).
+NODATA = {
+    'rainfall': 0.0,
+}
+MMAP_DIR = 'datasets_ndvi/mmap'
+METHODS = ('nearest', 'bilinear')
+POINT_CACHE_SIZE = 65536
+# Points are cached at ~1 m precision, far finer than any raster pixel
+POINT_DECIMALS = 5
+
+
+def read_band(path, nodata=None):
+    """First band as float64 with nodata pixels (the file's own, or `nodata` if given) set to NaN."""
+    with rasterio.open(path) as src:
+        data = src.read(1).astype(np.float64)
+        nodata = src.nodata if nodata is None else nodata
+    if nodata is not None and not np.isnan(nodata):
+        data[data == nodata] = np.nan
+    return data
+
+
+def _decoded_band(path, mmap_dir, nodata=None):
+    stat = os.stat(path)
+    # The nodata override changes the decoded values, so it is part of the name
+    masked = "" if nodata is None else f"-nodata{nodata:g}"
+    cache_path = Path(mmap_dir) / f"{Path(path).stem}-{int(stat.st_mtime)}-{stat.st_size}{masked}.npy"
+    if not cache_path.exists():
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        data = read_band(path, nodata)
+        # Write then rename so another process never maps half a file
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, data)
+        tmp_path.replace(cache_path)
+    return np.load(cache_path, mmap_mode='r')
+
+
+class MappedRaster:
+    def __init__(self, path, mmap_dir=MMAP_DIR, nodata=None):
+        with rasterio.open(path) as src:
+            self.transform = src.transform
+            self.bounds = src.bounds
+            self.crs = str(src.crs)
+        self.inverse = ~self.transform
+        self.data = _decoded_band(path, mmap_dir, nodata)
+
+    def pixel_positions(self, lons, lats):
+        """Fractional (row, col) of each point; integer parts are the pixel holding it."""
+        inv = self.inverse
+        cols = inv.a * lons + inv.b * lats + inv.c
+        rows = inv.d * lons + inv.e * lats + inv.f
+        return rows, cols
+
+    def sample(self, lons, lats, method='nearest'):
+        """Values at the points, NaN outside the raster or on nodata pixels."""
+        height, width = self.data.shape
+        rows, cols = self.pixel_positions(lons, lats)
+        values = np.full(len(lons), np.nan)
+
+        if method == 'nearest':
+            r, c = np.floor(rows).astype(int), np.floor(cols).astype(int)
+            inside = (r >= 0) & (r < height) & (c >= 0) & (c < width)
+            values[inside] = self.data[r[inside], c[inside]]
+            return values
+
+        # Bilinear between the four surrounding pixel centres
+        y, x = rows - 0.5, cols - 0.5
+        r0, c0 = np.floor(y).astype(int), np.floor(x).astype(int)
+        fy, fx = y - r0, x - c0
+        inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        total = np.zeros(len(lons))
+        weights = np.zeros(len(lons))
+        for dr, dc, w in ((0, 0, (1 - fy) * (1 - fx)), (0, 1, (1 - fy) * fx),
+                          (1, 0, fy * (1 - fx)), (1, 1, fy * fx)):
+            r = np.clip(r0 + dr, 0, height - 1)
+            c = np.clip(c0 + dc, 0, width - 1)
+            neighbour = self.data[r, c]
+            # Nodata neighbours (and those past the edge, via clipping) drop out and the rest are reweighted
+            ok = inside & ~np.isnan(neighbour)
+            total[ok] += w[ok] * neighbour[ok]
+            weights[ok] += w[ok]
+        has_weight = weights > 0
+        values[has_weight] = total[has_weight] / weights[has_weight]
+        return values
+
+    def info(self):
+        height, width = self.data.shape
+        return {
+            "crs": self.crs,
+            "bounds": {"west": self.bounds.left, "south": self.bounds.bottom,
+                       "east": self.bounds.right, "north": self.bounds.top},
+            "width": width,
+            "height": height,
+            "pixel_size": [self.transform.a, -self.transform.e],
+        }
+
+
+class RasterSampler:
+    def __init__(self, rasters=RASTERS, mmap_dir=MMAP_DIR, nodata=NODATA):
+        self.rasters = {name: MappedRaster(path, mmap_dir, nodata.get(name))
+                        for name, path in rasters.items() if Path(path).exists()}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def info(self):
+        return {name: raster.info() for name, raster in self.rasters.items()}
+
+    def sample(self, name, lons, lats, method='nearest'):
+        """
+        Values of raster `name` at the given points, as floats (None where
+        there is no data). Cached points are reused; the rest are sampled in
+        one vectorized pass.
+        """
+        raster = self.rasters[name]
+        keys = [(name, method, round(float(lon), POINT_DECIMALS), round(float(lat), POINT_DECIMALS))
+                for lon, lat in zip(lons, lats)]
+        values = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    values[i] = self._cache[key]
+                else:
+                    missing.append(i)
+        if not missing:
+            return values
+
+        sampled = raster.sample(np.array([keys[i][2] for i in missing]),
+                                np.array([keys[i][3] for i in missing]), method)
+        with self._lock:
+            for i, value in zip(missing, sampled):
+                values[i] = None if np.isnan(value) else float(value)
+                self._cache[keys[i]] = values[i]
+            while len(self._cache) > POINT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return values
@@ -0,0 +1,100 @@
+"""
+Precompute simplified district boundaries for the web map.
+
+The full-resolution IND_adm2 polygons are far too heavy to send to the
+browser. For each zoom level this simplifies the districts as one coverage
+(shared borders are simplified once, so neighbours still meet without gaps or
+overlaps), rounds coordinates to the precision that zoom can display, and
+writes a pre-gzipped GeoJSON file plus a manifest with ETags:
+
+    datasets_ndvi/boundaries/districts_z{zoom}.geojson.gz
+    datasets_ndvi/boundaries/manifest.json
+
+The server sends these files as-is from /api/boundaries/districts/{zoom}.
+Run from the backend/ folder:
+
+    python -m scripts.build_district_boundaries --state Karnataka
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import math
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+SHAPEFILE = "datasets_ndvi/IND_adm2.shp"
+OUTPUT_DIR = "datasets_ndvi/boundaries"
+ZOOM_LEVELS = [4, 6, 8, 10]
+PROPERTIES = ['ID_2', 'NAME_1', 'NAME_2', 'TYPE_2', 'ENGTYPE_2']
+
+
+def tolerance_for_zoom(zoom, pixels=0.5):
+    """Degrees covered by `pixels` screen pixels at this zoom (at the equator)."""
+    return pixels * 360.0 / (256 * 2 ** zoom)
+
+
+def build_level(regions, zoom):
+    tolerance = tolerance_for_zoom(zoom)
+    # Enough decimals to stay well below the simplification error
+    decimals = max(0, math.ceil(-math.log10(tolerance / 4)))
+
+    geometries = shapely.coverage_simplify(regions.geometry.values, tolerance)
+    geometries = shapely.transform(geometries, lambda coords: np.round(coords, decimals))
+
+    features = []
+    for geometry, (_, row) in zip(geometries, regions.iterrows()):
+        if geometry is None or geometry.is_empty:
+            continue
+        features.append({
+            "type": "Feature",
+            "properties": {key: (row[key].item() if hasattr(row[key], "item") else row[key])
+                           for key in PROPERTIES if key in regions.columns},
+            "geometry": json.loads(shapely.to_geojson(geometry)),
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build simplified district boundary files")
+    parser.add_argument("--shapefile", default=SHAPEFILE)
+    parser.add_argument("--state", help="Only keep districts of this state (NAME_1)")
+    parser.add_argument("--zooms", type=int, nargs="+", default=ZOOM_LEVELS)
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    regions = gpd.read_file(args.shapefile).to_crs(epsg=4326)
+    if args.state:
+        regions = regions[regions['NAME_1'] == args.state]
+    regions = regions.reset_index(drop=True)
+    print(f"Simplifying {len(regions)} districts for zoom levels {sorted(args.zooms)}")
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    levels = []
+    for zoom in sorted(args.zooms):
+        collection = build_level(regions, zoom)
+        raw = json.dumps(collection, separators=(",", ":")).encode()
+        # mtime=0 keeps the bytes (and so the ETag) stable across rebuilds of the same data
+        compressed = gzip.compress(raw, compresslevel=9, mtime=0)
+        filename = f"districts_z{zoom}.geojson.gz"
+        (output / filename).write_bytes(compressed)
+        levels.append({
+            "zoom": zoom,
+            "file": filename,
+            "etag": hashlib.sha1(raw).hexdigest()[:16],
+            "features": len(collection["features"]),
+            "bytes": len(raw),
+            "gzip_bytes": len(compressed),
+        })
+        print(f"  z{zoom}: {len(raw) / 1024:.0f} KiB GeoJSON, {len(compressed) / 1024:.0f} KiB gzipped")
+
+    (output / "manifest.json").write_text(json.dumps({"state": args.state, "levels": levels}, indent=2))
+    print(f"Boundaries saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Precompute a crop suitability map for the whole rainfall raster.
+
+Every cell of datasets_ndvi/rainfall_buffered_karnataka.tif becomes one crop
+model input: its rainfall from the raster, the other covariates (N, P, K,
+temperature, pH) fixed for the region. Raster values are turned into mm with
+--rainfall-scale (default RAINFALL_RASTER_SCALE, which the server uses too),
+and nodata cells (see raster_sampler.NODATA) stay nodata in the output. The
+crop forest is run over all cells in large chunks across a process pool and
+two rasters are written:
+
+    datasets_ndvi/suitability/top_crop.tif     uint8 index into classes.json (255 = no data)
+    datasets_ndvi/suitability/confidence.tif   float32 probability of the top crop
+    datasets_ndvi/suitability/classes.json     crop names, model version and covariates used
+
+The server renders these as XYZ tiles on /api/tiles/suitability/{z}/{x}/{y}.png.
+Run from the backend/ folder:
+
+    python -m scripts.build_suitability_grid --workers 8
+"""
+import argparse
+import json
+import math
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import rasterio
+
+import config
+from crop_features import crop_feature_matrix
+from model_registry import ModelSlot
+from raster_sampler import NODATA, read_band
+
+RAINFALL_RASTER = "datasets_ndvi/rainfall_buffered_karnataka.tif"
+CROP_DATASET = "crop-selector/datasets/crop_yield_by_rainfall.csv"
+CROP_MODEL = "crop-selector/crop_prediction_model.pkl"
+OUTPUT_DIR = "datasets_ndvi/suitability"
+NODATA_CLASS = 255
+# Largest default chunk, to bound the memory of one predict_proba call
+MAX_CHUNK_SIZE = 50_000
+
+_model = None
+
+
+def _init_worker(model_path):
+    global _model
+    _model = joblib.load(model_path)['model']
+
+
+def _score_chunk(features):
+    probabilities = _model.predict_proba(features)
+    top = probabilities.argmax(axis=1)
+    return top.astype(np.uint8), probabilities[np.arange(len(top)), top].astype(np.float32)
+
+
+def default_covariates(dataset_path=CROP_DATASET):
+    """Median soil and climate values of the training data, used where no raster exists."""
+    data = pd.read_csv(dataset_path)
+    return {col: float(data[col].median()) for col in ['N', 'P', 'K', 'temperature', 'ph']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the crop suitability rasters")
+    parser.add_argument("--rainfall", default=RAINFALL_RASTER)
+    parser.add_argument("--rainfall-scale", type=float, default=config.RAINFALL_RASTER_SCALE,
+                        help="Multiply raster values by this to get rainfall in mm (default: RAINFALL_RASTER_SCALE)")
+    parser.add_argument("--nodata", type=float, default=NODATA['rainfall'],
+                        help="Raster value that means no data")
+    parser.add_argument("--model-version", help="Crop model version to use (default: newest)")
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int,
+                        help=f"Cells per predict_proba call (default: split evenly over the workers, "
+                             f"at most {MAX_CHUNK_SIZE})")
+    for name in ['N', 'P', 'K', 'temperature', 'ph']:
+        parser.add_argument(f"--{name}", type=float, help=f"Fixed {name} (default: dataset median)")
+    args = parser.parse_args()
+    if args.rainfall_scale is None:
+        parser.error("--rainfall-scale is required when RAINFALL_RASTER_SCALE is not set")
+
+    covariates = default_covariates()
+    covariates.update({k: v for k, v in vars(args).items() if k in covariates and v is not None})
+
+    slot = ModelSlot('crop', CROP_MODEL, '.pkl', loader=None)
+    model_version = args.model_version or slot.latest_version()
+    model_path = slot.path_for(model_version)
+    classes = [str(c) for c in joblib.load(model_path)['model'].classes_]
+
+    with rasterio.open(args.rainfall) as src:
+        profile = src.profile
+    rainfall = read_band(args.rainfall, args.nodata)
+
+    valid = np.isfinite(rainfall)
+    cells = rainfall[valid] * args.rainfall_scale
+    # One model input row per valid raster cell
+    features = crop_feature_matrix(covariates['N'], covariates['P'], covariates['K'],
+                                   covariates['temperature'], covariates['ph'], cells)
+    # At least one chunk per worker, or the rest of the pool sits idle
+    chunk_size = args.chunk_size or min(MAX_CHUNK_SIZE, max(1, math.ceil(len(features) / args.workers)))
+    chunks = [features[i:i + chunk_size] for i in range(0, len(features), chunk_size)]
+    print(f"Scoring {len(features)} cells ({int((~valid).sum())} nodata skipped) in {len(chunks)} chunks with {args.workers} workers "
+          f"(model version {model_version})")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(str(model_path),)) as pool:
+        results = list(pool.map(_score_chunk, chunks))
+    print(f"Scored in {time.perf_counter() - start:.1f}s")
+
+    top_crop = np.full(rainfall.shape, NODATA_CLASS, dtype=np.uint8)
+    confidence = np.full(rainfall.shape, np.nan, dtype=np.float32)
+    if results:
+        top_crop[valid] = np.concatenate([top for top, _ in results])
+        confidence[valid] = np.concatenate([conf for _, conf in results])
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    profile.update(count=1, compress="deflate")
+    with rasterio.open(output / "top_crop.tif", "w", **{**profile, "dtype": "uint8", "nodata": NODATA_CLASS}) as dst:
+        dst.write(top_crop, 1)
+    with rasterio.open(output / "confidence.tif", "w", **{**profile, "dtype": "float32", "nodata": np.nan}) as dst:
+        dst.write(confidence, 1)
+    (output / "classes.json").write_text(json.dumps({
+        "classes": classes,
+        "model_version": model_version,
+        "covariates": covariates,
+        "rainfall_scale": args.rainfall_scale,
+        "built_at": int(time.time()),
+    }, indent=2))
+
+    # Tiles rendered from the previous build are stale now
+    shutil.rmtree(output / "tiles", ignore_errors=True)
+    print(f"Suitability rasters saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Shrink the crop forest for serving.
+
+1. Greedy ensemble selection: starting from no trees, repeatedly add the
+   tree that most improves accuracy (ties broken by the mean probability of
+   the true crop) on a selection set, and stop as soon as the subset is within
+   --tolerance of the full forest's accuracy.
+2. The chosen trees are converted to a CompactForest (see compact_forest.py):
+   float32 thresholds, uint16 leaf probabilities, flat node arrays.
+3. The result is saved to crop-selector/compact/<timestamp>-compact.pkl for
+   review. With --publish it goes to crop-selector/versions/ instead, where
+   it becomes the newest crop version and is served like any other.
+
+The selection and report sets are the two halves of make_model.py's test
+split, so neither was trained on and the reported accuracy isn't the one the
+trees were picked for. File size, load time, RSS growth on load and
+predict_proba latency are reported before and after. RSS is measured in a
+bare interpreter that has only imported joblib, scikit-learn's forest and
+compact_forest, so it is the memory of the model itself.
+Run from the backend/ folder:
+
+    python -m scripts.compact_crop_forest --tolerance 0.005 --output benchmarks/results/compaction.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from compact_forest import COMPACT_SUFFIX, CompactForest, latest_full_version
+from crop_features import crop_feature_matrix
+from model_registry import ModelSlot
+
+CROP_DATASET = "crop-selector/datasets/crop_yield_by_rainfall.csv"
+CROP_MODEL = "crop-selector/crop_prediction_model.pkl"
+UNPUBLISHED_DIR = "crop-selector/compact"
+
+# Current RSS (not peak) around a load, in an interpreter with nothing else imported
+LOAD_RSS_SCRIPT = """
+import os, sys
+import joblib
+import sklearn.ensemble
+import compact_forest
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+before = rss()
+model = joblib.load(sys.argv[1])
+print(rss() - before)
+"""
+
+
+def evaluation_sets(seed):
+    data = pd.read_csv(CROP_DATASET)
+    # make_model.py's split, so these rows were never trained on
+    _, test = train_test_split(data, test_size=0.2, random_state=42)
+    selection, report = train_test_split(test, test_size=0.5, random_state=seed, stratify=test['crop'])
+
+    def features(rows):
+        return (crop_feature_matrix(rows['N'], rows['P'], rows['K'], rows['temperature'],
+                                    rows['ph'], rows['rainfall']), rows['crop'].to_numpy())
+    return features(selection), features(report)
+
+
+def greedy_selection(forest, X, y, tolerance, min_trees=1):
+    """Indices of a small subset of trees whose averaged vote is within `tolerance` of the full forest."""
+    target = np.searchsorted(forest.classes_, y)
+    # (trees, rows, classes) probabilities of every tree, computed once
+    tree_probabilities = np.stack([tree.predict_proba(X) for tree in forest.estimators_])
+    full_accuracy = np.mean(tree_probabilities.mean(axis=0).argmax(axis=1) == target)
+
+    selected = []
+    remaining = list(range(len(forest.estimators_)))
+    total = np.zeros(tree_probabilities.shape[1:])
+    while remaining:
+        candidates = (total[None] + tree_probabilities[remaining]) / (len(selected) + 1)
+        correct = (candidates.argmax(axis=2) == target).sum(axis=1)
+        true_probability = candidates[:, np.arange(len(target)), target].mean(axis=1)
+        # Accuracy first; true-crop probability (< 1) only separates equal counts
+        best = int(np.argmax(correct + true_probability))
+        tree = remaining.pop(best)
+        selected.append(tree)
+        total += tree_probabilities[tree]
+        if len(selected) >= min_trees and correct[best] / len(target) >= full_accuracy - tolerance:
+            break
+    return selected, full_accuracy
+
+
+def load_rss_bytes(path):
+    output = subprocess.run([sys.executable, "-c", LOAD_RSS_SCRIPT, str(path)],
+                            capture_output=True, text=True, check=True).stdout
+    return int(output.strip().splitlines()[-1])
+
+
+def measure(path, X, y, repeats):
+    load_times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        model = joblib.load(path)['model']
+        load_times.append(time.perf_counter() - start)
+    rss = load_rss_bytes(path)
+
+    model.predict_proba(X[:1])
+    latencies = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(X[i % len(X)][None, :])
+        latencies.append((time.perf_counter() - start) * 1000)
+    batch = np.repeat(X, max(1, 10_000 // len(X)), axis=0)
+    start = time.perf_counter()
+    model.predict_proba(batch)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "trees": len(model.estimators_) if hasattr(model, "estimators_") else model.n_estimators,
+        "file_bytes": Path(path).stat().st_size,
+        "load_ms": float(np.median(load_times) * 1000),
+        "load_rss_bytes": rss,
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "batch_us_per_row": batch_seconds / len(batch) * 1e6,
+        "accuracy": float(np.mean(model.predict(X) == y)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune and compact the crop forest")
+    parser.add_argument("--version", help="Crop model version to compact (default: newest full forest)")
+    parser.add_argument("--tolerance", type=float, default=0.005, help="Accuracy the pruned forest may lose")
+    parser.add_argument("--min-trees", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-repeats", type=int, default=200)
+    parser.add_argument("--publish", action="store_true",
+                        help="Save into crop-selector/versions/ so the server serves it as the newest version")
+    parser.add_argument("--output", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    slot = ModelSlot('crop', CROP_MODEL, '.pkl', loader=None)
+    version = args.version or latest_full_version(slot)
+    source = slot.path_for(version)
+    model_data = joblib.load(source)
+    forest = model_data['model']
+    if isinstance(forest, CompactForest):
+        raise SystemExit(f"Version {version} is already compact; pass --version of a full forest")
+
+    (X_select, y_select), (X_report, y_report) = evaluation_sets(args.seed)
+    start = time.perf_counter()
+    selected, full_accuracy = greedy_selection(forest, X_select, y_select, args.tolerance, args.min_trees)
+    print(f"Selected {len(selected)} of {len(forest.estimators_)} trees in {time.perf_counter() - start:.1f}s "
+          f"(selection accuracy {full_accuracy * 100:.2f}% full, tolerance {args.tolerance * 100:.2f} points)")
+
+    compact = CompactForest(forest, sorted(selected))
+    # Quantisation error against the same trees in scikit-learn
+    reference = np.mean([forest.estimators_[i].predict_proba(X_report) for i in selected], axis=0)
+    max_error = float(np.abs(compact.predict_proba(X_report) - reference).max())
+
+    compact_version = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}{COMPACT_SUFFIX}"
+    compact_data = {
+        **model_data,
+        'model': compact,
+        'compaction': {'source_version': version, 'trees': sorted(selected), 'tolerance': args.tolerance},
+    }
+    if args.publish:
+        target = slot.publish(compact_version, lambda path: joblib.dump(compact_data, path))
+    else:
+        target = Path(UNPUBLISHED_DIR) / f"{compact_version}.pkl"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(compact_data, target)
+
+    report = {
+        "source_version": version,
+        "compact_version": compact_version,
+        "max_probability_error": max_error,
+        "before": measure(source, X_report, y_report, args.latency_repeats),
+        "after": measure(target, X_report, y_report, args.latency_repeats),
+    }
+    before, after = report["before"], report["after"]
+    print(f"\n{'':<18} {'before':>12} {'after':>12}")
+    for key, label, scale in [("trees", "trees", 1), ("file_bytes", "file KiB", 1 / 1024),
+                              ("load_ms", "load ms", 1), ("load_rss_bytes", "load RSS MiB", 1 / 2 ** 20),
+                              ("latency_p50_ms", "p50 ms", 1), ("latency_p95_ms", "p95 ms", 1),
+                              ("batch_us_per_row", "batch us/row", 1), ("accuracy", "accuracy %", 100)]:
+        print(f"{label:<18} {before[key] * scale:>12.2f} {after[key] * scale:>12.2f}")
+    print(f"Max predict_proba difference from the selected trees: {max_error:.2e}")
+    if args.publish:
+        print(f"\nCompact model published as version {compact_version} ({target})")
+    else:
+        print(f"\nCompact model saved to {target}; re-run with --publish to serve it")
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
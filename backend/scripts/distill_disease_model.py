@@ -0,0 +1,238 @@
+"""
+Distil the plant disease CNN into a small depthwise-separable student.
+
+The teacher (disease-plant/make_model.py) flattens a 30x30x64 feature map
+into Dense(128), about 7.4M parameters, most of the model's size and CPU time.
+The student is a MobileNet-style stack of depthwise + pointwise convolutions
+ending in global average pooling. It has the same 128x128 input, /255
+scaling and output classes, so the server can swap one for the other.
+
+The student learns from the teacher's temperature-softened probabilities,
+mixed with the true labels (--alpha weights the soft loss). Teacher outputs
+are computed once, up front. The split is the same as make_model.py's
+ImageDataGenerator(validation_split=0.2): the first 20% of each class's files
+(sorted) are validation, so both models are scored on images the teacher
+never trained on.
+
+Size, single-image and batch latency, accuracy and agreement with the
+teacher are reported for both models. The student is saved as a version of
+the server's `disease_student` model, disease-plant/student/versions/<ts>-student.h5.
+It is served with DISEASE_MODEL=student or per request with ?model=student.
+Run from the backend/ folder:
+
+    python -m scripts.distill_disease_model --data /path/to/PlantVillage --epochs 10
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, models
+from tensorflow.keras.models import load_model
+
+from model_registry import ModelSlot
+
+TEACHER_MODEL = "disease-plant/my_plant_model.h5"
+STUDENT_MODEL = "disease-plant/student/my_plant_student.h5"
+IMAGE_SIZE = (128, 128)
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+VALIDATION_SPLIT = 0.2
+
+
+def list_images(data_dir):
+    """Train/validation file lists and labels, split like flow_from_directory(subset=...)."""
+    classes = sorted(entry.name for entry in os.scandir(data_dir) if entry.is_dir())
+    splits = {"train": ([], []), "validation": ([], [])}
+    for label, name in enumerate(classes):
+        files = sorted(str(path) for path in Path(data_dir, name).rglob("*")
+                       if path.suffix.lower() in IMAGE_EXTENSIONS)
+        cut = int(VALIDATION_SPLIT * len(files))
+        for subset, subset_files in (("validation", files[:cut]), ("train", files[cut:])):
+            splits[subset][0].extend(subset_files)
+            splits[subset][1].extend([label] * len(subset_files))
+    return classes, {subset: (np.array(paths), np.array(labels)) for subset, (paths, labels) in splits.items()}
+
+
+def _read_image(path):
+    # The server's load_leaf_image: PIL nearest resize via load_img, then /255.
+    # tf.image.resize samples pixel centres differently, so it can't stand in.
+    img = tf.keras.utils.load_img(path.numpy().decode(), target_size=IMAGE_SIZE)
+    return tf.keras.utils.img_to_array(img) / 255.0
+
+
+def load_image(path):
+    data = tf.py_function(_read_image, [path], tf.float32)
+    data.set_shape((*IMAGE_SIZE, 3))
+    return data
+
+
+def image_dataset(paths, *extra, batch_size, shuffle=False, seed=0):
+    dataset = tf.data.Dataset.from_tensor_slices((paths, *extra))
+    if shuffle:
+        dataset = dataset.shuffle(len(paths), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.map(lambda path, *rest: (load_image(path), *rest), num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def separable_block(x, filters, stride):
+    x = layers.DepthwiseConv2D(3, strides=stride, padding="same", use_bias=False)(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.ReLU()(x)
+    x = layers.Conv2D(filters, 1, use_bias=False)(x)
+    x = layers.BatchNormalization()(x)
+    return layers.ReLU()(x)
+
+
+def build_student(num_classes, width=1.0):
+    def channels(n):
+        return max(8, int(n * width))
+
+    inputs = layers.Input(shape=(*IMAGE_SIZE, 3))
+    x = layers.Conv2D(channels(16), 3, strides=2, padding="same", use_bias=False)(inputs)
+    x = layers.BatchNormalization()(x)
+    x = layers.ReLU()(x)
+    for filters, stride in [(32, 1), (64, 2), (64, 1), (128, 2), (128, 1), (256, 2)]:
+        x = separable_block(x, channels(filters), stride)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.Dropout(0.2)(x)
+    logits = layers.Dense(num_classes, name="logits")(x)
+    # The server reads probabilities, like the teacher's softmax output
+    outputs = layers.Softmax(name="probabilities")(logits)
+    return models.Model(inputs, outputs, name="disease_student")
+
+
+def soften(probabilities, temperature):
+    """Teacher probabilities re-softened at `temperature` (the teacher only exposes its softmax)."""
+    return tf.nn.softmax(tf.math.log(probabilities + 1e-7) / temperature)
+
+
+def predict_all(model, dataset):
+    return np.concatenate([model(images, training=False).numpy() for images, *_ in dataset])
+
+
+def measure(model, path, dataset, labels, teacher_predictions=None, repeats=50):
+    predictions = predict_all(model, dataset)
+    image = next(iter(dataset))[0][:1]
+    batch = next(iter(dataset))[0]
+    model.predict(image, verbose=0)
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(image, verbose=0)
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    for _ in range(5):
+        model.predict(batch, verbose=0)
+    batch_ms = (time.perf_counter() - start) / (5 * len(batch)) * 1000
+
+    result = {
+        "parameters": int(model.count_params()),
+        "file_bytes": Path(path).stat().st_size,
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "batch_ms_per_image": batch_ms,
+        "accuracy": float(np.mean(predictions.argmax(axis=1) == labels)),
+    }
+    if teacher_predictions is not None:
+        result["teacher_agreement"] = float(np.mean(predictions.argmax(axis=1) == teacher_predictions.argmax(axis=1)))
+    return result, predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distil the disease CNN into a small student network")
+    parser.add_argument("--data", required=True, help="PlantVillage folder with one subfolder per class")
+    parser.add_argument("--teacher-version", help="Disease model version to distil (default: newest)")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--temperature", type=float, default=4.0)
+    parser.add_argument("--alpha", type=float, default=0.9, help="Weight of the soft (teacher) loss")
+    parser.add_argument("--learning-rate", type=float, default=1e-3)
+    parser.add_argument("--width", type=float, default=1.0, help="Channel multiplier for the student")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the report as JSON")
+    args = parser.parse_args()
+    tf.random.set_seed(args.seed)
+
+    teacher_slot = ModelSlot('disease', TEACHER_MODEL, '.h5', loader=None)
+    teacher_version = args.teacher_version or teacher_slot.latest_version()
+    teacher_path = teacher_slot.path_for(teacher_version)
+    teacher = load_model(teacher_path)
+    num_classes = teacher.output_shape[-1]
+
+    classes, splits = list_images(args.data)
+    if len(classes) != num_classes:
+        raise SystemExit(f"{args.data} has {len(classes)} class folders, the teacher predicts {num_classes}")
+    train_paths, train_labels = splits["train"]
+    val_paths, val_labels = splits["validation"]
+    print(f"{len(train_paths)} training and {len(val_paths)} validation images, {num_classes} classes")
+
+    # Teacher outputs once; every epoch reuses them
+    start = time.perf_counter()
+    teacher_train = predict_all(teacher, image_dataset(train_paths, batch_size=args.batch_size))
+    print(f"Teacher soft labels computed in {time.perf_counter() - start:.0f}s")
+
+    student = build_student(num_classes, args.width)
+    logits_model = models.Model(student.inputs, student.get_layer("logits").output)
+    optimizer = tf.keras.optimizers.Adam(args.learning_rate)
+    kl_divergence = tf.keras.losses.KLDivergence()
+    cross_entropy = tf.keras.losses.SparseCategoricalCrossentropy(from_logits=True)
+    temperature = args.temperature
+
+    @tf.function
+    def train_step(images, labels, teacher_probabilities):
+        soft_targets = soften(teacher_probabilities, temperature)
+        with tf.GradientTape() as tape:
+            logits = logits_model(images, training=True)
+            # T^2 keeps the soft-loss gradients on the same scale as the hard loss
+            soft_loss = kl_divergence(soft_targets, tf.nn.softmax(logits / temperature)) * temperature ** 2
+            hard_loss = cross_entropy(labels, logits)
+            loss = args.alpha * soft_loss + (1 - args.alpha) * hard_loss
+        gradients = tape.gradient(loss, logits_model.trainable_variables)
+        optimizer.apply_gradients(zip(gradients, logits_model.trainable_variables))
+        return loss
+
+    train = image_dataset(train_paths, train_labels, teacher_train.astype(np.float32),
+                          batch_size=args.batch_size, shuffle=True, seed=args.seed)
+    val = image_dataset(val_paths, batch_size=args.batch_size)
+    for epoch in range(args.epochs):
+        start = time.perf_counter()
+        losses = [float(train_step(images, labels, soft)) for images, labels, soft in train]
+        val_accuracy = np.mean(predict_all(student, val).argmax(axis=1) == val_labels)
+        print(f"Epoch {epoch + 1}/{args.epochs}: loss {np.mean(losses):.4f}, "
+              f"validation accuracy {val_accuracy * 100:.2f}% ({time.perf_counter() - start:.0f}s)")
+
+    student_slot = ModelSlot('disease_student', STUDENT_MODEL, '.h5', loader=None)
+    version = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-student"
+    student_path = student_slot.publish(version, student.save)
+
+    teacher_report, teacher_val = measure(teacher, teacher_path, val, val_labels)
+    student_report, _ = measure(load_model(student_path), student_path, val, val_labels, teacher_val)
+    report = {
+        "teacher_version": teacher_version,
+        "student_version": version,
+        "classes": classes,
+        "settings": {key: getattr(args, key) for key in ("epochs", "temperature", "alpha", "width", "seed")},
+        "teacher": teacher_report,
+        "student": student_report,
+    }
+
+    print(f"\n{'':<20} {'teacher':>12} {'student':>12}")
+    for key, label, scale in [("parameters", "parameters (k)", 1e-3), ("file_bytes", "file MiB", 1 / 2 ** 20),
+                              ("latency_p50_ms", "p50 ms", 1), ("latency_p95_ms", "p95 ms", 1),
+                              ("batch_ms_per_image", "batch ms/image", 1), ("accuracy", "accuracy %", 100)]:
+        print(f"{label:<20} {teacher_report[key] * scale:>12.2f} {student_report[key] * scale:>12.2f}")
+    print(f"Student agrees with the teacher on {student_report['teacher_agreement'] * 100:.2f}% of validation images")
+    print(f"\nStudent saved as disease_student version {version} ({student_path})")
+    print("Serve it with DISEASE_MODEL=student, or per request with ?model=student")
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
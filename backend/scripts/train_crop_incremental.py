@@ -0,0 +1,163 @@
+"""
+Incrementally update the crop forest with new field-verified records.
+
+crop-selector/make_model.py fits all 200 trees from scratch. This script
+starts from an existing model version instead:
+
+1. Rows of the new CSV(s) (same columns as crop_yield_by_rainfall.csv) are
+   fingerprinted and any the model has already been trained on are dropped.
+   A legacy model counts the whole of crop_yield_by_rainfall.csv as seen.
+2. New trees are added with warm_start. They train on the new rows plus a
+   class-stratified replay sample of the original dataset, so each one still
+   knows every crop and the forest's class list stays the same.
+3. With --max-trees, the oldest trees are retired to keep the forest at
+   that size.
+4. The result is written as a new version in crop-selector/versions/. The
+   server picks it up via the model watcher or an admin reload.
+
+For comparison, a full retrain (make_model.py's settings) is also fitted on
+all the data. The time taken and held-out accuracy of both are printed.
+Run from the backend/ folder:
+
+    python -m scripts.train_crop_incremental field_records.csv --trees 50 --max-trees 300
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from compact_forest import latest_full_version
+from crop_features import crop_feature_matrix
+from model_registry import ModelSlot
+
+CROP_DATASET = "crop-selector/datasets/crop_yield_by_rainfall.csv"
+CROP_MODEL = "crop-selector/crop_prediction_model.pkl"
+COLUMNS = ['N', 'P', 'K', 'temperature', 'ph', 'rainfall', 'crop']
+
+
+def fingerprints(data):
+    """Stable 64-bit hash of each row's features and label."""
+    return pd.util.hash_pandas_object(data[COLUMNS], index=False).to_numpy()
+
+
+def features_and_labels(data):
+    features = crop_feature_matrix(data['N'], data['P'], data['K'], data['temperature'],
+                                   data['ph'], data['rainfall'])
+    return features, data['crop'].to_numpy()
+
+
+def replay_sample(data, size, seed):
+    """About `size` rows, spread evenly over the crops (at least one of each)."""
+    per_class = max(1, size // data['crop'].nunique())
+    return data.sample(frac=1, random_state=seed).groupby('crop').head(per_class)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add trees trained on new records to the crop forest")
+    parser.add_argument("new_data", nargs="+", help="CSV file(s) of new records")
+    parser.add_argument("--base-version", help="Model version to update (default: newest full forest)")
+    parser.add_argument("--trees", type=int, default=50, help="Trees to add")
+    parser.add_argument("--max-trees", type=int, help="Retire the oldest trees beyond this many")
+    parser.add_argument("--replay", type=int, help="Rows of the original dataset mixed in (default: as many as new rows)")
+    parser.add_argument("--test-size", type=float, default=0.2, help="Share of the new rows held out for evaluation")
+    parser.add_argument("--skip-full", action="store_true", help="Don't fit a full retrain for comparison")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    slot = ModelSlot('crop', CROP_MODEL, '.pkl', loader=None)
+    base_version = args.base_version or latest_full_version(slot)
+    model_data = joblib.load(slot.path_for(base_version))
+    model = model_data['model']
+    if not hasattr(model, 'estimators_'):
+        raise SystemExit(f"Version {base_version} is a compacted forest; pass --base-version of a full forest")
+    history = model_data.get('training', {})
+
+    base_data = pd.read_csv(CROP_DATASET)
+    # Same split as make_model.py, so the base test rows were never trained on
+    base_train, base_test = train_test_split(base_data, test_size=0.2, random_state=42)
+    seen = history.get('fingerprints')
+    if seen is None:
+        seen = fingerprints(base_data)
+
+    new_data = pd.concat([pd.read_csv(path) for path in args.new_data], ignore_index=True)
+    new_data = new_data.drop_duplicates(subset=COLUMNS)
+    is_new = ~np.isin(fingerprints(new_data), seen)
+    new_data = new_data[is_new]
+    print(f"{len(new_data)} new rows ({int((~is_new).sum())} already seen) for model version {base_version}")
+    if new_data.empty:
+        print("Nothing to train on")
+        return
+    unknown_crops = set(new_data['crop']) - set(model.classes_)
+    if unknown_crops:
+        raise SystemExit(f"New crops {sorted(unknown_crops)} need a full retrain (crop-selector/make_model.py)")
+
+    if len(new_data) >= 10 and args.test_size > 0:
+        new_train, new_test = train_test_split(new_data, test_size=args.test_size, random_state=args.seed)
+    else:
+        new_train, new_test = new_data, new_data.iloc[:0]
+    replay = replay_sample(base_train, args.replay or len(new_train), args.seed)
+    X_batch, y_batch = features_and_labels(pd.concat([new_train, replay]))
+
+    # Incremental update: only the added trees are fitted
+    trees_before = len(model.estimators_)
+    start = time.perf_counter()
+    model.set_params(warm_start=True, n_estimators=trees_before + args.trees, random_state=args.seed)
+    model.fit(X_batch, y_batch)
+    model.set_params(warm_start=False)
+    retired = 0
+    if args.max_trees and len(model.estimators_) > args.max_trees:
+        # Trees are appended in training order, so the oldest come first
+        retired = len(model.estimators_) - args.max_trees
+        model.estimators_ = model.estimators_[retired:]
+        model.n_estimators = len(model.estimators_)
+    incremental_seconds = time.perf_counter() - start
+
+    X_base_test, y_base_test = features_and_labels(base_test)
+    X_new_test, y_new_test = features_and_labels(new_test)
+
+    def accuracy(forest):
+        base_accuracy = accuracy_score(y_base_test, forest.predict(X_base_test))
+        new_accuracy = accuracy_score(y_new_test, forest.predict(X_new_test)) if len(new_test) else float('nan')
+        return base_accuracy, new_accuracy
+
+    base_accuracy, new_accuracy = accuracy(model)
+    print(f"Incremental: +{args.trees} trees, -{retired} retired ({len(model.estimators_)} total) "
+          f"in {incremental_seconds:.2f}s, accuracy base holdout {base_accuracy * 100:.2f}%, "
+          f"new holdout {new_accuracy * 100:.2f}%")
+
+    if not args.skip_full:
+        # Same settings as crop-selector/make_model.py, on everything the incremental model has seen
+        X_all, y_all = features_and_labels(pd.concat([base_train, new_train]))
+        full = RandomForestClassifier(n_estimators=200, max_depth=10, random_state=42)
+        start = time.perf_counter()
+        full.fit(X_all, y_all)
+        full_seconds = time.perf_counter() - start
+        base_accuracy, new_accuracy = accuracy(full)
+        print(f"Full retrain: 200 trees in {full_seconds:.2f}s, accuracy base holdout {base_accuracy * 100:.2f}%, "
+              f"new holdout {new_accuracy * 100:.2f}% ({full_seconds / incremental_seconds:.1f}x the incremental time)")
+
+    version = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+    model_data['model'] = model
+    model_data['training'] = {
+        'parent_version': base_version,
+        # Held-out rows stay unseen, so they are trained on next time
+        'fingerprints': np.union1d(seen, fingerprints(new_train)),
+        'batches': history.get('batches', []) + [{
+            'version': version,
+            'rows': len(new_train),
+            'replay_rows': len(replay),
+            'trees_added': args.trees,
+            'trees_retired': retired,
+        }],
+    }
+    path = slot.publish(version, lambda staging_path: joblib.dump(model_data, staging_path))
+    print(f"Model version {version} saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
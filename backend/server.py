@@ -1,23 +1,75 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile
+from fastapi import FastAPI, HTTPException, File, Form, Header, Request, UploadFile
 from pydantic import BaseModel
 import joblib
 import numpy as np
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 from typing import Optional
 from tensorflow.keras.preprocessing import image
 from tensorflow.keras.models import load_model
 import io
+import json
+import time
+import zipfile
+import asyncio
+import config
+import metrics
+import profiling
+from metrics import stage
+from crop_features import calculate_soil_quality, crop_feature_matrix
+from crop_sensitivity import SensitivityGrid
+from boundaries import DistrictBoundaries
+from bulk_upload import BulkLimitExceeded, BulkUpload
+from jobs import STATUSES, JobQueue
+import job_handlers  # registers the job kinds
+from model_registry import ModelSlot
+from raster_sampler import METHODS, RasterSampler
+from suitability_tiles import MAX_ZOOM, SuitabilityTiles
+from water_advisor import WaterAdvisor
+
+def load_crop_model(path):
+    model_data = joblib.load(path)
+    return model_data['model']  # Get the model from the saved data
+
+def warm_up_crop_model(model):
+    model.predict_proba(np.zeros((1, model.n_features_in_)))
+
+def warm_up_disease_model(model):
+    model.predict(np.zeros((1, 128, 128, 3)), verbose=0)
+
+# Versioned, hot-reloadable models (see model_registry.py)
+crop_models = ModelSlot('crop', './crop-selector/crop_prediction_model.pkl', '.pkl',
+                        load_crop_model, warm_up_crop_model, config.CROP_MODEL_VERSION)
+disease_models = ModelSlot('disease', './disease-plant/my_plant_model.h5', '.h5',
+                           load_model, warm_up_disease_model, config.DISEASE_MODEL_VERSION)
+# Small distilled CNN (scripts/distill_disease_model.py), an alternative to the full disease model
+disease_student_models = ModelSlot('disease_student', './disease-plant/student/my_plant_student.h5', '.h5',
+                                   load_model, warm_up_disease_model, config.DISEASE_STUDENT_VERSION)
+MODEL_SLOTS = {slot.name: slot for slot in (crop_models, disease_models, disease_student_models)}
+DISEASE_MODELS = {"teacher": disease_models, "student": disease_student_models}
 
 # Load the saved models
-model_data = joblib.load('./crop-selector/crop_prediction_model.pkl')
-model_crop = model_data['model']  # Get the model from the saved data
-encoder = joblib.load('./water-advisor/encoder.pkl')
-scaler = joblib.load('./water-advisor/scaler.pkl')
+for slot in MODEL_SLOTS.values():
+    # The student only exists once it has been distilled; the watcher picks it up later
+    if slot is not disease_student_models or slot.available_versions() or slot.legacy_path.exists():
+        slot.reload()
+    if config.MODEL_WATCH_INTERVAL > 0:
+        slot.watch(config.MODEL_WATCH_INTERVAL)
+
+# Load the water advisor model with its scaler
+water_advisor = metrics.timed_load('water', WaterAdvisor, './water-advisor/crop_model.pkl', './water-advisor/scaler.pkl')
+
+# Precomputed crop suitability map (built by scripts/build_suitability_grid.py)
+suitability_tiles = SuitabilityTiles('./datasets_ndvi/suitability')
+TILE_CACHE_CONTROL = "public, max-age=86400"
 
-# Load the plant disease model
-plant_disease_model = load_model('./disease-plant/my_plant_model.h5')
+# Rainfall and NDVI rasters, memory-mapped for point lookups
+raster_sampler = metrics.timed_load('rasters', RasterSampler)
+
+# Simplified district boundaries (built by scripts/build_district_boundaries.py)
+district_boundaries = DistrictBoundaries('./datasets_ndvi/boundaries')
 
 # Define class indices for plant disease prediction
 PLANT_DISEASE_CLASSES = {
@@ -51,6 +103,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record request latency, in-flight requests and errors for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Opt-in per-request profiling (see profiling.py)
+profile_store = profiling.ProfileStore(config.PROFILE_DIR, config.PROFILE_KEEP)
+app.add_middleware(
+    profiling.ProfilingMiddleware,
+    store=profile_store,
+    enabled=config.PROFILING_ENABLED,
+    token=config.PROFILING_TOKEN,
+    sample_every=config.PROFILE_SAMPLE_EVERY,
+)
+
+# Background jobs (NDVI processing, retraining, batch scoring); run by `python -m jobs`
+job_queue = JobQueue(config.JOBS_DB)
+
 # Define the input schema for crop prediction with new optional fields
 class CropInput(BaseModel):
     N: float
@@ -58,18 +126,33 @@ class CropInput(BaseModel):
     K: float
     temperature: float
     ph: float
-    rainfall: float
+    # Filled in from the rainfall raster at lat/lon when left out
+    rainfall: Optional[float] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
     soil_type: Optional[str] = None
     irrigation_type: Optional[str] = None
     season: Optional[str] = None
     crop_type: Optional[str] = None
 
-def calculate_soil_quality(N, P, K):
-    N_norm = N / 100
-    P_norm = P / 100
-    K_norm = K / 100
-    quality = (N_norm * 0.4 + P_norm * 0.3 + K_norm * 0.3) * 100
-    return quality
+class ScenarioRange(BaseModel):
+    start: float
+    stop: float
+    steps: int = 11
+
+    def values(self):
+        return np.linspace(self.start, self.stop, self.steps)
+
+class CropSensitivityInput(BaseModel):
+    base: CropInput
+    rainfall: ScenarioRange
+    temperature: ScenarioRange
+
+class RasterSampleInput(BaseModel):
+    lats: list[float]
+    lons: list[float]
+    layers: Optional[list[str]] = None
+    method: str = "nearest"
 
 # Function to handle unseen labels during prediction
 def safe_transform(encoder, value):
@@ -78,75 +161,520 @@ def safe_transform(encoder, value):
     except ValueError:
         return -1
 
+# Prometheus metrics endpoint
+@app.get("/metrics")
+def metrics_endpoint():
+    return Response(metrics.export(), media_type=metrics.CONTENT_TYPE)
+
+def require_profile_access(profile_token, admin_token):
+    # Profiles can include stacks from other users' concurrent requests
+    if config.PROFILING_TOKEN is not None and profile_token == config.PROFILING_TOKEN:
+        return
+    require_admin(admin_token)
+
+# Profiles recorded by the profiling middleware
+@app.get("/api/profiles/{profile_id}")
+def get_profile(profile_id: str, x_profile_token: Optional[str] = Header(None),
+                x_admin_token: Optional[str] = Header(None)):
+    require_profile_access(x_profile_token, x_admin_token)
+    path = profile_store.summary_path(profile_id) if config.PROFILING_ENABLED or config.PROFILE_SAMPLE_EVERY else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json")
+
+@app.get("/api/profiles/{profile_id}/raw")
+def get_profile_raw(profile_id: str, x_profile_token: Optional[str] = Header(None),
+                    x_admin_token: Optional[str] = Header(None)):
+    require_profile_access(x_profile_token, x_admin_token)
+    path = profile_store.raw_path(profile_id) if config.PROFILING_ENABLED or config.PROFILE_SAMPLE_EVERY else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=path.name)
+
+def fill_rainfall(input_data):
+    """Take rainfall from the raster when the caller only gave a location; returns where it came from."""
+    if input_data.rainfall is not None:
+        return "input"
+    if input_data.lat is None or input_data.lon is None:
+        raise HTTPException(status_code=400, detail="Either rainfall or lat and lon are required")
+    if "rainfall" not in raster_sampler.rasters:
+        raise HTTPException(status_code=400, detail="Rainfall raster is not available, rainfall is required")
+    if config.RAINFALL_RASTER_SCALE is None:
+        # Without a known scale the raster's values can't be turned into mm
+        raise HTTPException(status_code=400, detail="RAINFALL_RASTER_SCALE is not set, rainfall is required")
+    value = raster_sampler.sample("rainfall", [input_data.lon], [input_data.lat], "bilinear")[0]
+    if value is None:
+        raise HTTPException(status_code=400, detail="No rainfall data at this location, rainfall is required")
+    input_data.rainfall = value * config.RAINFALL_RASTER_SCALE
+    return "raster"
+
+def crop_recommendation(crop, probabilities, soil_quality, input_data, top_n=3):
+    # Get the top predicted crops
+    top_crops_indices = np.argsort(probabilities[0])[::-1][:top_n]
+
+    # Fetch top crops and probabilities
+    top_crops = [(crop.model.classes_[i], probabilities[0][i]) for i in top_crops_indices]
+
+    return {
+        "model_version": crop.version,
+        "predicted_crop": " | ".join([crop for crop, _ in top_crops]),
+        "confidence": float(max(probabilities[0])),
+        "soil_quality": float(soil_quality),
+        "additional_info": {
+            "soil_type": input_data.soil_type,
+            "irrigation_type": input_data.irrigation_type,
+            "season": input_data.season,
+            "crop_type": input_data.crop_type
+        }
+    }
+
 # API endpoint for crop prediction
 @app.post("/api/crop")
 def crop_predict(input_data: CropInput):
+    endpoint = "/api/crop"
+    crop = crop_models.current
+    with stage(endpoint, "rainfall"):
+        rainfall_source = fill_rainfall(input_data)
     try:
-        # Calculate soil quality
-        soil_quality = calculate_soil_quality(input_data.N, input_data.P, input_data.K)
-        
-        # Convert input to numpy array for prediction
-        features = np.array([[input_data.N, input_data.P, input_data.K, 
-                            input_data.temperature, 
-                            input_data.ph, input_data.rainfall,
-                            soil_quality]])
+        with stage(endpoint, "features"):
+            # Calculate soil quality
+            soil_quality = calculate_soil_quality(input_data.N, input_data.P, input_data.K)
+
+            # Convert input to numpy array for prediction
+            features = crop_feature_matrix(input_data.N, input_data.P, input_data.K,
+                                           input_data.temperature, input_data.ph, input_data.rainfall)
         
         # Predict probabilities for each crop
-        probabilities = model_crop.predict_proba(features)
-        
-        # Get the top 3 predicted crops
-        top_n = 3
-        top_crops_indices = np.argsort(probabilities[0])[::-1][:top_n]
-        
-        # Fetch top crops and probabilities
-        top_crops = [(model_crop.classes_[i], probabilities[0][i]) for i in top_crops_indices]
+        with stage(endpoint, "predict"):
+            probabilities = crop.model.predict_proba(features)
         
-        # Format the response
-        return {
-            "predicted_crop": " | ".join([crop for crop, _ in top_crops]),
-            "confidence": float(max(probabilities[0])),
-            "soil_quality": float(soil_quality),
-            "additional_info": {
-                "soil_type": input_data.soil_type,
-                "irrigation_type": input_data.irrigation_type,
-                "season": input_data.season,
-                "crop_type": input_data.crop_type
-            }
-        }
+        with stage(endpoint, "serialize"):
+            # Format the response
+            result = crop_recommendation(crop, probabilities, soil_quality, input_data)
+            result["rainfall"] = {"value": float(input_data.rainfall), "source": rainfall_source}
+            return JSONResponse(result)
     except Exception as e:
+        metrics.ERRORS.labels(endpoint, "error_response").inc()
         return {"error": str(e)}
 
+# How the crop recommendation changes across a grid of rainfall and temperature scenarios
+@app.post("/api/crop/sensitivity")
+def crop_sensitivity(input_data: CropSensitivityInput):
+    endpoint = "/api/crop/sensitivity"
+    crop = crop_models.current
+    fill_rainfall(input_data.base)
+    steps = (input_data.rainfall.steps, input_data.temperature.steps)
+    if min(steps) < 1 or steps[0] * steps[1] > config.SENSITIVITY_MAX_CELLS:
+        raise HTTPException(status_code=400,
+                            detail=f"The grid must have between 1 and {config.SENSITIVITY_MAX_CELLS} cells")
+
+    with stage(endpoint, "predict"):
+        grid = SensitivityGrid(crop.model, input_data.base,
+                               input_data.rainfall.values(), input_data.temperature.values(), crop.version)
+    if steps[0] * steps[1] > config.SENSITIVITY_STREAM_CELLS:
+        return StreamingResponse(grid.ndjson(), media_type="application/x-ndjson")
+    with stage(endpoint, "serialize"):
+        return JSONResponse(grid.to_dict())
+
 def extract_last_double_underscore_text(text):
     parts = text.split('__')
     return parts[-1] if len(parts) > 1 else None
 
+def load_leaf_image(contents, endpoint):
+    """Decode an uploaded leaf photo into a normalized (1, 128, 128, 3) batch."""
+    with stage(endpoint, "decode"):
+        img = image.load_img(io.BytesIO(contents), target_size=(128, 128))
+    with stage(endpoint, "normalize"):
+        img_array = image.img_to_array(img) / 255.0
+        return np.expand_dims(img_array, axis=0)
+
+def current_disease_model(name=None):
+    """The loaded teacher or student disease model (default: DISEASE_MODEL)."""
+    slot = DISEASE_MODELS.get(name or config.DISEASE_MODEL)
+    if slot is None:
+        raise HTTPException(status_code=400, detail=f"model must be one of {', '.join(DISEASE_MODELS)}")
+    if slot.current is None:
+        raise HTTPException(status_code=503, detail=f"The {name or config.DISEASE_MODEL} disease model is not loaded")
+    return slot.current
+
+def disease_result(disease, prediction):
+    predicted_class = np.argmax(prediction)
+    confidence = float(prediction[0][predicted_class])
+
+    # Get the predicted label
+    predicted_label = PLANT_DISEASE_CLASSES[predicted_class]
+
+    return {
+        "model_version": disease.version,
+        "disease": extract_last_double_underscore_text(predicted_label) or predicted_label,
+        "confidence": confidence,
+        "is_healthy": "healthy" in predicted_label.lower()
+    }
+
 # API endpoint for plant disease prediction
 @app.post("/api/disease-predict")
-async def predict_disease(file: UploadFile = File(...)):
+async def predict_disease(file: UploadFile = File(...), model: Optional[str] = None):
     """
     Endpoint to predict plant disease from an uploaded image.
+    Pass ?model=student or ?model=teacher to override DISEASE_MODEL.
     """
+    endpoint = "/api/disease-predict"
+    disease = current_disease_model(model)
     try:
         # Read and validate the image
-        contents = await file.read()
-        img = image.load_img(io.BytesIO(contents), target_size=(128, 128))
-        img_array = image.img_to_array(img) / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
+        with stage(endpoint, "read"):
+            contents = await file.read()
+        img_array = load_leaf_image(contents, endpoint)
 
         # Make prediction
-        prediction = plant_disease_model.predict(img_array)
-        predicted_class = np.argmax(prediction)
-        confidence = float(prediction[0][predicted_class])
-
-        # Get the predicted label
-        predicted_label = PLANT_DISEASE_CLASSES[predicted_class]
+        with stage(endpoint, "predict"):
+            prediction = disease.model.predict(img_array)
 
-        return {
-            "disease": extract_last_double_underscore_text(predicted_label) or predicted_label,
-            "confidence": confidence,
-            "is_healthy": "healthy" in predicted_label.lower()
-        }
+        with stage(endpoint, "serialize"):
+            return JSONResponse(disease_result(disease, prediction))
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
-    
\ No newline at end of file
+
+def classify_leaf_batch(disease, batch, start_index, endpoint):
+    """Decode a batch of uploaded images and run them through the CNN in one forward pass."""
+    results = [None] * len(batch)
+    arrays, decoded = [], []
+    for i, (filename, read) in enumerate(batch):
+        try:
+            arrays.append(load_leaf_image(read(), endpoint))
+            decoded.append(i)
+        except Exception as e:
+            results[i] = {"index": start_index + i, "filename": filename, "error": str(e)}
+
+    if arrays:
+        with stage(endpoint, "predict"):
+            predictions = disease.model.predict(np.concatenate(arrays), verbose=0)
+        for i, prediction in zip(decoded, predictions):
+            results[i] = {"index": start_index + i, "filename": batch[i][0],
+                          **disease_result(disease, prediction[np.newaxis])}
+    return results
+
+async def bulk_predictions(upload, disease, endpoint):
+    try:
+        errors = 0
+        for start in range(0, len(upload.entries), config.BULK_BATCH_SIZE):
+            batch = upload.entries[start:start + config.BULK_BATCH_SIZE]
+            results = await run_in_threadpool(classify_leaf_batch, disease, batch, start, endpoint)
+            errors += sum("error" in result for result in results)
+            yield "".join(json.dumps(result) + "\n" for result in results)
+        yield json.dumps({"summary": {"images": len(upload.entries), "errors": errors,
+                                      "bytes": upload.total_bytes}}) + "\n"
+    finally:
+        upload.close()
+
+# Bulk plant disease prediction for field surveys
+@app.post("/api/disease-predict/bulk")
+async def predict_disease_bulk(request: Request):
+    """
+    Classify many leaf photos in one request. Send a zip archive as the request
+    body (Content-Type: application/zip) or a multipart form of images and/or
+    zip archives. Results stream back as NDJSON, one line per image in upload
+    order as each CNN batch finishes, followed by a summary line.
+    """
+    endpoint = "/api/disease-predict/bulk"
+    disease = current_disease_model(request.query_params.get("model"))
+    upload = BulkUpload(config.BULK_MAX_IMAGES, config.BULK_MAX_BYTES)
+    try:
+        content_length = int(request.headers.get("content-length") or 0)
+        if content_length > config.BULK_MAX_BYTES:
+            raise BulkLimitExceeded(f"Upload exceeds the {config.BULK_MAX_BYTES} byte limit")
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            # The form parser reads the whole body before we see it, so its size must be known up front
+            if not content_length:
+                raise HTTPException(status_code=411, detail="Multipart uploads need a Content-Length header")
+            async with request.form(max_files=config.BULK_MAX_IMAGES) as form:
+                upload.add_form(form)
+        else:
+            await upload.add_zip_stream(request.stream())
+    except BulkLimitExceeded as e:
+        upload.close()
+        raise HTTPException(status_code=413, detail=str(e))
+    except zipfile.BadZipFile as e:
+        upload.close()
+        raise HTTPException(status_code=400, detail=f"Invalid zip archive: {e}")
+    except BaseException:
+        upload.close()
+        raise
+
+    if not upload.entries:
+        upload.close()
+        raise HTTPException(status_code=400, detail="No images found in the upload")
+    return StreamingResponse(bulk_predictions(upload, disease, endpoint), media_type="application/x-ndjson")
+
+class WaterSweepInput(BaseModel):
+    rainfall: float
+    temperature: float
+    soil_type: Optional[str] = None
+    water_scarcity: Optional[str] = None
+    top_n: Optional[int] = None
+    feasible_only: bool = False
+
+# Every crop and irrigation combination for one plot, ranked by predicted water use
+@app.post("/api/water/sweep")
+def water_sweep(input_data: WaterSweepInput):
+    endpoint = "/api/water/sweep"
+    with stage(endpoint, "sweep"):
+        sweep = water_advisor.sweep(input_data.rainfall, input_data.temperature,
+                                    input_data.soil_type, input_data.water_scarcity)
+    options = sweep["options"]
+    if input_data.feasible_only:
+        options = [option for option in options if option["feasibility"] != "Not Feasible"]
+    if input_data.top_n is not None:
+        options = options[:max(input_data.top_n, 0)]
+    return {**sweep, "options": options}
+
+async def run_timed(timings, name, func, *args):
+    """Run a blocking model call in the default executor and record its wall time."""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        return await loop.run_in_executor(None, func, *args)
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
+
+# Raster extents and resolutions, for clients deciding where sampling makes sense
+@app.get("/api/rasters")
+def list_rasters():
+    return raster_sampler.info()
+
+# Rainfall/NDVI values at many points in one call
+@app.post("/api/rasters/sample")
+def sample_rasters(input_data: RasterSampleInput):
+    endpoint = "/api/rasters/sample"
+    layers = input_data.layers or list(raster_sampler.rasters)
+    unknown = [layer for layer in layers if layer not in raster_sampler.rasters]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown raster(s): {', '.join(unknown)}")
+    if input_data.method not in METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(METHODS)}")
+    if len(input_data.lats) != len(input_data.lons):
+        raise HTTPException(status_code=400, detail="lats and lons must have the same length")
+    if len(input_data.lats) > config.RASTER_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {config.RASTER_MAX_POINTS} points per request")
+
+    with stage(endpoint, "sample"):
+        values = {layer: raster_sampler.sample(layer, input_data.lons, input_data.lats, input_data.method)
+                  for layer in layers}
+    return {"method": input_data.method, "values": values}
+
+# Combined plot assessment: crop recommendation, water advice and disease check in one call
+@app.post("/api/assess")
+async def assess_plot(
+    lat: float = Form(...),
+    lon: float = Form(...),
+    N: float = Form(...),
+    P: float = Form(...),
+    K: float = Form(...),
+    ph: float = Form(...),
+    temperature: float = Form(...),
+    rainfall: Optional[float] = Form(None),
+    soil_type: Optional[str] = Form(None),
+    irrigation_type: Optional[str] = Form(None),
+    season: Optional[str] = Form(None),
+    crop_type: Optional[str] = Form(None),
+    water_crop: Optional[str] = Form(None),
+    water_scarcity: Optional[str] = Form(None),
+    expected_yield: Optional[float] = Form(None),
+    crop_cycle_duration: Optional[float] = Form(None),
+    file: Optional[UploadFile] = File(None),
+    disease_model: Optional[str] = None,
+):
+    """
+    Assess a plot in one round trip. The crop forest, the water model and the
+    CNN are independent, so they run concurrently in the threadpool and the
+    response time is close to the slowest of them rather than their sum.
+    Water advice needs `water_crop` and the disease check needs a leaf image;
+    either is null in the response when its input is missing. Use
+    ?disease_model=student or ?disease_model=teacher to override DISEASE_MODEL.
+    """
+    endpoint = "/api/assess"
+    started = time.perf_counter()
+    crop = crop_models.current
+    # Only a leaf image needs a disease model, so crop and water checks work without one
+    disease = current_disease_model(disease_model) if file is not None else None
+    input_data = CropInput(N=N, P=P, K=K, temperature=temperature, ph=ph, rainfall=rainfall,
+                           lat=lat, lon=lon, soil_type=soil_type, irrigation_type=irrigation_type,
+                           season=season, crop_type=crop_type)
+    # Without a rainfall value, use the rainfall raster at the plot
+    fill_rainfall(input_data)
+    rainfall = input_data.rainfall
+
+    # Shared features are computed once for all models
+    with stage(endpoint, "features"):
+        soil_quality = calculate_soil_quality(N, P, K)
+        features = crop_feature_matrix(N, P, K, temperature, ph, rainfall)
+    contents = None
+    if file is not None:
+        with stage(endpoint, "read"):
+            contents = await file.read()
+
+    def crop_task():
+        with stage(endpoint, "crop"):
+            return crop_recommendation(crop, crop.model.predict_proba(features), soil_quality, input_data)
+
+    def water_task():
+        with stage(endpoint, "water"):
+            return water_advisor.advise(rainfall, temperature, soil_type, irrigation_type,
+                                        water_scarcity, water_crop, expected_yield, crop_cycle_duration)
+
+    def disease_task():
+        img_array = load_leaf_image(contents, endpoint)
+        with stage(endpoint, "disease"):
+            return disease_result(disease, disease.model.predict(img_array, verbose=0))
+
+    timings = {}
+    tasks = {"crop": run_timed(timings, "crop", crop_task)}
+    if water_crop:
+        tasks["water"] = run_timed(timings, "water", water_task)
+    if contents:
+        tasks["disease"] = run_timed(timings, "disease", disease_task)
+
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    response = {"location": {"lat": lat, "lon": lon}, "soil_quality": float(soil_quality),
+                "crop": None, "water": None, "disease": None, "errors": {}}
+    for name, result in zip(tasks, results):
+        if isinstance(result, Exception):
+            metrics.ERRORS.labels(endpoint, "error_response").inc()
+            response["errors"][name] = str(result)
+        else:
+            response[name] = result
+
+    timings["total"] = (time.perf_counter() - started) * 1000
+    response["timings_ms"] = timings
+    return JSONResponse(response)
+    
+
+# Colours used for each crop on the suitability tiles
+@app.get("/api/tiles/suitability/legend")
+def suitability_legend():
+    if not suitability_tiles.available():
+        raise HTTPException(status_code=404, detail="Suitability grid has not been built")
+    return suitability_tiles.legend()
+
+# XYZ tiles of the top crop per cell, for the Leaflet map
+@app.get("/api/tiles/suitability/{z}/{x}/{y}.png")
+def suitability_tile(z: int, x: int, y: int, if_none_match: Optional[str] = Header(None)):
+    if not suitability_tiles.available():
+        raise HTTPException(status_code=404, detail="Suitability grid has not been built")
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    headers = {"ETag": suitability_tiles.etag(z, x, y), "Cache-Control": TILE_CACHE_CONTROL}
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(suitability_tiles.get(z, x, y), media_type="image/png", headers=headers)
+
+# Zoom levels the district boundaries were simplified for
+@app.get("/api/boundaries/districts")
+def district_boundary_levels():
+    if not district_boundaries.available():
+        raise HTTPException(status_code=404, detail="District boundaries have not been built")
+    return {"levels": district_boundaries.levels(), "state": district_boundaries.state}
+
+# District boundaries simplified for a zoom level, as (pre-gzipped) GeoJSON
+@app.get("/api/boundaries/districts/{zoom}")
+def district_boundaries_geojson(zoom: int, if_none_match: Optional[str] = Header(None),
+                                accept_encoding: Optional[str] = Header(None)):
+    if not district_boundaries.available():
+        raise HTTPException(status_code=404, detail="District boundaries have not been built")
+    level = district_boundaries.level_for(zoom)
+    gzipped = bool(accept_encoding and "gzip" in accept_encoding)
+    headers = {"ETag": district_boundaries.etag(level, gzipped), "Cache-Control": "public, max-age=604800",
+               "Vary": "Accept-Encoding"}
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(district_boundaries.gzipped(level), media_type="application/geo+json", headers=headers)
+    return Response(district_boundaries.plain(level), media_type="application/geo+json", headers=headers)
+
+def require_admin(token):
+    if config.ADMIN_TOKEN is None or token != config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+# Model versions currently served, plus reload state
+@app.get("/api/admin/models")
+def list_models(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    return {name: slot.status() for name, slot in MODEL_SLOTS.items()}
+
+# Load a model version in the background and swap it in once it is warmed up
+@app.post("/api/admin/models/{name}/reload", status_code=202)
+def reload_model(name: str, version: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    slot = MODEL_SLOTS.get(name)
+    if slot is None:
+        raise HTTPException(status_code=404, detail=f"Unknown model '{name}'")
+    try:
+        slot.reload_in_background(version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"model": name, "requested_version": version or slot.pinned_version or slot.latest_version(),
+            "serving_version": slot.current.version if slot.current else None}
+
+class JobRequest(BaseModel):
+    kind: str
+    params: dict = {}
+
+def get_job_or_404(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# Submit a background job
+@app.post("/api/jobs", status_code=202)
+def submit_job(request: JobRequest, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    try:
+        job_id = job_queue.submit(request.kind, request.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job_queue.get(job_id)
+
+@app.get("/api/jobs")
+def list_jobs(status: Optional[str] = None, limit: int = 50):
+    if status is not None and status not in STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(STATUSES)}")
+    return job_queue.list(status, min(limit, 500))
+
+# Status, progress and (once finished) result of a job
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = get_job_or_404(job_id)
+    # Checkpoints are internal resume state and can be large
+    job.pop("checkpoint")
+    return job
+
+# Download an output file listed in a finished job's result
+@app.get("/api/jobs/{job_id}/outputs/{name}")
+def get_job_output(job_id: str, name: str):
+    job = get_job_or_404(job_id)
+    if job["status"] != "succeeded" or name not in (job["result"] or {}).get("outputs", []):
+        raise HTTPException(status_code=404, detail="Output not found")
+    return FileResponse(Path(config.JOBS_DIR) / job_id / name, filename=name)
+
+@app.post("/api/jobs/{job_id}/cancel")
+def cancel_job(job_id: str, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    get_job_or_404(job_id)
+    job = job_queue.cancel(job_id)
+    job.pop("checkpoint")
+    return job
+
+# Run a failed or cancelled job again from its last checkpoint
+@app.post("/api/jobs/{job_id}/resume", status_code=202)
+def resume_job(job_id: str, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    job = get_job_or_404(job_id)
+    if not job_queue.resume(job_id):
+        raise HTTPException(status_code=409,
+                            detail=f"Only failed or cancelled jobs can be resumed, this one is {job['status']}")
+    job = job_queue.get(job_id)
+    job.pop("checkpoint")
+    return job
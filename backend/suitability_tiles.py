@@ -0,0 +1,151 @@
+"""
+XYZ map tiles for the precomputed crop suitability rasters.
+
+scripts/build_suitability_grid.py writes the rasters; this module samples them
+onto 256x256 Web Mercator tiles. The hue of each pixel is the top crop and its
+opacity the model confidence. Rendered tiles are kept in memory and on disk
+under suitability/tiles/, which the build script clears. Tiles with nothing on
+them are all the same EMPTY_TILE and are never written to disk.
+"""
+import io
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import rasterio
+from PIL import Image
+
+TILE_SIZE = 256
+# The rainfall cells are kilometres wide, so deeper tiles would only upscale
+# them; the map (maxNativeZoom) stretches zoom 12 tiles past this
+MAX_ZOOM = 12
+MEMORY_CACHE_TILES = 2048
+NODATA_CLASS = 255
+
+# Distinct colours, one per crop class (the crop dataset has 22)
+PALETTE = np.array([
+    (230, 25, 75), (60, 180, 75), (255, 225, 25), (0, 130, 200), (245, 130, 48),
+    (145, 30, 180), (70, 240, 240), (240, 50, 230), (210, 245, 60), (250, 190, 212),
+    (0, 128, 128), (220, 190, 255), (170, 110, 40), (255, 250, 200), (128, 0, 0),
+    (170, 255, 195), (128, 128, 0), (255, 215, 180), (0, 0, 128), (128, 128, 128),
+    (255, 255, 255), (0, 0, 0),
+], dtype=np.uint8)
+
+
+def _png(rgba):
+    buffer = io.BytesIO()
+    Image.fromarray(rgba).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+EMPTY_TILE = _png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+def tile_pixel_centers(z, x, y):
+    """Longitudes of the tile's pixel columns and latitudes of its pixel rows."""
+    n = 2 ** z
+    offsets = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+    lons = (x + offsets) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+    return lons, lats
+
+
+class SuitabilityTiles:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.tile_dir = self.directory / "tiles"
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+
+    def available(self):
+        return (self.directory / "classes.json").exists()
+
+    def _load(self):
+        # Rasters are small (one value per rainfall cell), so keep them in memory
+        meta_path = self.directory / "classes.json"
+        mtime = meta_path.stat().st_mtime
+        meta = json.loads(meta_path.read_text())
+        with rasterio.open(self.directory / "top_crop.tif") as src:
+            self.top_crop = src.read(1)
+            self.transform = src.transform
+        with rasterio.open(self.directory / "confidence.tif") as src:
+            self.confidence = np.nan_to_num(src.read(1), nan=0.0)
+        self.classes = meta["classes"]
+        self.build_id = str(meta["built_at"])
+        self._memory.clear()
+        self._loaded_mtime = mtime
+
+    def _ensure_loaded(self):
+        # Pick up a rebuilt grid without restarting the server
+        mtime = (self.directory / "classes.json").stat().st_mtime
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                if mtime != self._loaded_mtime:
+                    self._load()
+
+    def legend(self):
+        self._ensure_loaded()
+        return {
+            "build_id": self.build_id,
+            "crops": [{"crop": crop, "color": "#%02x%02x%02x" % tuple(PALETTE[i % len(PALETTE)])}
+                      for i, crop in enumerate(self.classes)],
+        }
+
+    def etag(self, z, x, y):
+        self._ensure_loaded()
+        return f'"{self.build_id}-{z}-{x}-{y}"'
+
+    def render(self, z, x, y):
+        lons, lats = tile_pixel_centers(z, x, y)
+        # Inverse of the north-up geotransform: pixel centre -> raster row/col
+        cols = np.floor((lons - self.transform.c) / self.transform.a).astype(int)
+        rows = np.floor((lats - self.transform.f) / self.transform.e).astype(int)
+        height, width = self.top_crop.shape
+        col_ok = (cols >= 0) & (cols < width)
+        row_ok = (rows >= 0) & (rows < height)
+        if not col_ok.any() or not row_ok.any():
+            return EMPTY_TILE
+
+        grid = np.ix_(np.clip(rows, 0, height - 1), np.clip(cols, 0, width - 1))
+        classes = self.top_crop[grid]
+        confidence = self.confidence[grid]
+        inside = row_ok[:, None] & col_ok[None, :] & (classes != NODATA_CLASS)
+        if not inside.any():
+            return EMPTY_TILE
+
+        rgba = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+        rgba[..., :3] = PALETTE[classes % len(PALETTE)]
+        # Keep low-confidence cells faintly visible
+        rgba[..., 3] = np.where(inside, 60 + confidence * 195, 0).astype(np.uint8)
+        return _png(rgba)
+
+    def get(self, z, x, y):
+        """PNG bytes for a tile, from memory, disk or freshly rendered."""
+        self._ensure_loaded()
+        key = (z, x, y)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self.tile_dir / str(z) / str(x) / f"{y}.png"
+        if path.exists():
+            tile = path.read_bytes()
+        else:
+            tile = self.render(z, x, y)
+            # Empty tiles share one bytes object in memory and never reach the disk cache
+            if tile is not EMPTY_TILE:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Write then rename so a concurrent reader never sees half a file
+                tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+                tmp_path.write_bytes(tile)
+                tmp_path.replace(path)
+
+        with self._lock:
+            self._memory[key] = tile
+            if len(self._memory) > MEMORY_CACHE_TILES:
+                self._memory.popitem(last=False)
+        return tile
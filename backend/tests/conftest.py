@@ -0,0 +1,9 @@
+import pytest
+
+import jobs
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs.config, "JOBS_DIR", str(tmp_path / "outputs"))
+    return jobs.JobQueue(str(tmp_path / "jobs.sqlite3"))
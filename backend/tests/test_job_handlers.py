@@ -0,0 +1,25 @@
+"""
+Run from the backend/ folder:
+
+    python -m pytest tests
+"""
+import numpy as np
+
+import jobs
+from job_handlers import district_ndvi_row
+
+
+def test_ndvi_checkpoint_accepts_shapefile_values(queue):
+    # Attribute values read by geopandas are numpy scalars
+    row = {'NAME_1': 'Karnataka', 'NAME_2': 'Bangalore Urban', 'ID_2': np.int64(223)}
+    result = district_ndvi_row(7, row, np.float64(0.42), {'center_lon': np.float64(77.6), 'center_lat': 12.9})
+
+    job_id = queue.submit("ndvi_districts", {})
+    with jobs.JobContext(queue, queue.claim("test")) as ctx:
+        ctx.progress(0.5, "1/2 districts", {"next_index": 1, "results": [result]})
+
+    checkpoint = queue.get(job_id)["checkpoint"]
+    assert checkpoint["next_index"] == 1
+    assert checkpoint["results"] == [{'Region': 'Region_7', 'Mean_NDVI': 0.42, 'Center_Lon': 77.6,
+                                      'Center_Lat': 12.9, 'NAME_1': 'Karnataka',
+                                      'NAME_2': 'Bangalore Urban', 'ID_2': 223}]
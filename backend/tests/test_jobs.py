@@ -0,0 +1,42 @@
+"""
+Run from the backend/ folder:
+
+    python -m pytest tests
+"""
+import job_handlers  # noqa: F401  (registers the job kinds)
+
+
+def test_requeued_job_ignores_its_previous_worker(queue):
+    job_id = queue.submit("crop_batch_score", {})
+    queue.claim("old")
+    # The old worker stops heartbeating and its job is handed to a new one
+    queue.requeue_stale(stale_after=-1)
+    queue.claim("new")
+
+    assert queue.heartbeat(job_id, "old", 0.9, checkpoint={"rows_done": 900})
+    queue.finish(job_id, "old", "succeeded", result={"rows": 900})
+    job = queue.get(job_id)
+    assert job["status"] == "running"
+    assert job["worker"] == "new"
+    assert job["checkpoint"] is None
+
+    assert not queue.heartbeat(job_id, "new", 0.5, checkpoint={"rows_done": 500})
+    queue.finish(job_id, "new", "succeeded", result={"rows": 1000})
+    job = queue.get(job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"rows": 1000}
+
+
+def test_failed_job_resumes_from_its_checkpoint(queue):
+    job_id = queue.submit("crop_batch_score", {})
+    queue.claim("worker")
+    queue.heartbeat(job_id, "worker", 0.4, checkpoint={"rows_done": 400})
+    queue.finish(job_id, "worker", "failed", error="OSError: disk full")
+
+    assert queue.resume(job_id)
+    assert not queue.resume(job_id)
+    job = queue.claim("worker")
+    assert job["id"] == job_id
+    assert job["checkpoint"] == {"rows_done": 400}
+    assert job["error"] is None
+    assert job["attempts"] == 2
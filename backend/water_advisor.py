@@ -0,0 +1,195 @@
+"""
+Water advisor model (water-advisor/crop_model.pkl) used by the server.
+
+water-advisor/make_model.py label-encodes every categorical column by
+re-fitting one LabelEncoder, so the saved encoder.pkl only remembers the last
+column (Crop_Name). The codes the model was trained with for the other
+columns are the sorted category values of the training data, so they are
+rebuilt here from the dataset.
+"""
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+
+WATER_DATASET = './water-advisor/datasets/agricultural_water_footprint.csv'
+
+# Same renames and feature order as water-advisor/make_model.py
+COLUMN_NAMES = {
+    'Water Use (m³/kg)': 'Water_Use',
+    'Rainfall Requirement (mm/year)': 'Rainfall_Requirement',
+    'Temperature Requirement (°C)': 'Temperature_Requirement',
+    'Soil Type': 'Soil_Type',
+    'Irrigation Type': 'Irrigation_Type',
+    'Water Scarcity': 'Water_Scarcity',
+    'Yield (tons/ha)': 'Yield',
+    'Crop Cycle Duration (days)': 'Crop_Cycle_Duration',
+    'Crop': 'Crop_Name'
+}
+FEATURES = [
+    'Rainfall_Requirement',
+    'Temperature_Requirement',
+    'Soil_Type',
+    'Irrigation_Type',
+    'Water_Scarcity',
+    'Yield',
+    'Crop_Cycle_Duration',
+    'Crop_Name'
+]
+CATEGORICAL_COLUMNS = ['Soil_Type', 'Irrigation_Type', 'Water_Scarcity', 'Crop_Name']
+
+# The crop selector form uses different soil names than the water dataset
+SOIL_TYPE_ALIASES = {
+    'clay': 'Clayey',
+    'clayey': 'Clayey',
+    'loamy': 'Loamy',
+    'sandy': 'Sandy',
+    'silt': 'Silty',
+    'silty': 'Silty'
+}
+
+# Sweeps kept in memory, keyed by (rounded) plot conditions
+SWEEP_CACHE_SIZE = 1024
+
+
+def load_water_dataset(path=WATER_DATASET):
+    return pd.read_csv(path).rename(columns=COLUMN_NAMES)
+
+
+def category_codes(data):
+    codes = {}
+    for col in CATEGORICAL_COLUMNS:
+        values = sorted(data[col].dropna().unique())
+        # pandas reads the "None" irrigation type as NaN, which LabelEncoder sorts last
+        if data[col].isna().any():
+            values.append('None')
+        codes[col] = {value: i for i, value in enumerate(values)}
+    return codes
+
+
+def grade_feasibility(temperature, rainfall, temp_req, rain_req):
+    if abs(temperature - temp_req) <= 5 and abs(rainfall - rain_req) <= 200:
+        return "Feasible"
+    elif abs(temperature - temp_req) <= 10 and abs(rainfall - rain_req) <= 400:
+        return "Moderately Feasible"
+    else:
+        return "Not Feasible"
+
+
+class WaterAdvisor:
+    def __init__(self, model_path, scaler_path, dataset_path=WATER_DATASET):
+        self.model = joblib.load(model_path)
+        self.scaler = joblib.load(scaler_path)
+        data = load_water_dataset(dataset_path)
+        self.codes = category_codes(data)
+        # Typical yield and cycle length per crop, used when the caller doesn't know them
+        self.crop_defaults = data.groupby('Crop_Name')[['Yield', 'Crop_Cycle_Duration']].median().to_dict('index')
+        self._sweeps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, column, value):
+        """Code for a categorical value, or -1 if the model never saw it."""
+        if column == 'Soil_Type' and value is not None:
+            value = SOIL_TYPE_ALIASES.get(value.lower(), value)
+        return self.codes[column].get(value, -1)
+
+    def feature_row(self, rainfall, temperature, soil_type, irrigation_type, water_scarcity,
+                    crop_name, crop_yield=None, crop_cycle_duration=None):
+        defaults = self.crop_defaults.get(crop_name, {})
+        return [
+            rainfall,
+            temperature,
+            self.encode('Soil_Type', soil_type),
+            self.encode('Irrigation_Type', irrigation_type),
+            self.encode('Water_Scarcity', water_scarcity),
+            crop_yield if crop_yield is not None else defaults.get('Yield', np.nan),
+            crop_cycle_duration if crop_cycle_duration is not None else defaults.get('Crop_Cycle_Duration', np.nan),
+            self.encode('Crop_Name', crop_name)
+        ]
+
+    def predict(self, rows):
+        """Predict water use, temperature and rainfall for a batch of feature rows."""
+        return self.model.predict(self.scaler.transform(np.asarray(rows, dtype=float)))
+
+    def advise(self, rainfall, temperature, soil_type, irrigation_type, water_scarcity,
+               crop_name, crop_yield=None, crop_cycle_duration=None):
+        row = self.feature_row(rainfall, temperature, soil_type, irrigation_type, water_scarcity,
+                               crop_name, crop_yield, crop_cycle_duration)
+        if np.isnan(row[5]) or np.isnan(row[6]):
+            raise ValueError(f"Yield and crop cycle duration are required for unknown crop '{crop_name}'")
+        water_use, predicted_temperature, predicted_rainfall = self.predict([row])[0]
+        unknown = [col for col, value in zip(FEATURES, row) if col in CATEGORICAL_COLUMNS and value == -1]
+        return {
+            "crop": crop_name,
+            "irrigation_type": irrigation_type,
+            "predicted_water_use": float(water_use),
+            "predicted_temperature": float(predicted_temperature),
+            "predicted_rainfall": float(predicted_rainfall),
+            "feasibility": grade_feasibility(predicted_temperature, predicted_rainfall, temperature, rainfall),
+            "unknown_labels": unknown
+        }
+
+    def sweep(self, rainfall, temperature, soil_type, water_scarcity):
+        """
+        Predicted water use of every crop and irrigation type the model knows
+        (the crops are encoder.pkl's classes) on one plot, lowest first.
+
+        Rainfall is rounded to 1 mm and temperature to 0.1 °C, which is well
+        below what the model resolves, so nearby plots share a cached sweep.
+        Soil type and water scarcity are cached by their code, so spellings
+        that mean the same soil share it too; the echoed conditions are added
+        per call. The options list is shared between callers and must not be
+        modified.
+        """
+        rainfall, temperature = round(float(rainfall)), round(float(temperature), 1)
+        soil_code = self.encode('Soil_Type', soil_type)
+        scarcity_code = self.encode('Water_Scarcity', water_scarcity)
+        conditions = {"rainfall": rainfall, "temperature": temperature,
+                      "soil_type": soil_type, "water_scarcity": water_scarcity}
+        key = (rainfall, temperature, soil_code, scarcity_code)
+        with self._lock:
+            if key in self._sweeps:
+                self._sweeps.move_to_end(key)
+                return {"conditions": conditions, **self._sweeps[key]}
+
+        crops = list(self.codes['Crop_Name'])
+        irrigation_types = list(self.codes['Irrigation_Type'])
+        n_crops, n_irrigation = len(crops), len(irrigation_types)
+
+        # One row per (crop, irrigation type), crop-major
+        rows = np.empty((n_crops * n_irrigation, len(FEATURES)))
+        rows[:, 0] = rainfall
+        rows[:, 1] = temperature
+        rows[:, 2] = soil_code
+        rows[:, 3] = np.tile(list(self.codes['Irrigation_Type'].values()), n_crops)
+        rows[:, 4] = scarcity_code
+        defaults = [[self.crop_defaults[crop]['Yield'], self.crop_defaults[crop]['Crop_Cycle_Duration']] for crop in crops]
+        rows[:, 5:7] = np.repeat(defaults, n_irrigation, axis=0)
+        rows[:, 7] = np.repeat(list(self.codes['Crop_Name'].values()), n_irrigation)
+        predictions = self.predict(rows)
+
+        options = []
+        for i in np.argsort(predictions[:, 0], kind='stable'):
+            water_use, predicted_temperature, predicted_rainfall = predictions[i]
+            options.append({
+                "rank": len(options) + 1,
+                "crop": crops[i // n_irrigation],
+                "irrigation_type": irrigation_types[i % n_irrigation],
+                "predicted_water_use": float(water_use),
+                "predicted_temperature": float(predicted_temperature),
+                "predicted_rainfall": float(predicted_rainfall),
+                "feasibility": grade_feasibility(predicted_temperature, predicted_rainfall, temperature, rainfall)
+            })
+        result = {
+            "unknown_labels": [col for col, code in (('Soil_Type', soil_code), ('Water_Scarcity', scarcity_code))
+                               if code == -1],
+            "options": options
+        }
+
+        with self._lock:
+            self._sweeps[key] = result
+            if len(self._sweeps) > SWEEP_CACHE_SIZE:
+                self._sweeps.popitem(last=False)
+        return {"conditions": conditions, **result}
@@ -1,5 +1,5 @@
 import React, { useState, useRef, useEffect } from "react";
-import { MapContainer, TileLayer, FeatureGroup, useMap } from "react-leaflet";
+import { MapContainer, TileLayer, FeatureGroup, GeoJSON, LayersControl, useMap, useMapEvents } from "react-leaflet";
 import { EditControl } from "react-leaflet-draw";
 import axios from "axios";
 
@@ -36,6 +36,44 @@ const MapInitializer = () => {
   return null;
 };
 
+// District outlines, simplified on the server for the current zoom level
+const DistrictBoundaries = () => {
+  const map = useMapEvents({
+    zoomend: () => setZoom(map.getZoom()),
+  });
+  const [zoom, setZoom] = useState(map.getZoom());
+  const [levels, setLevels] = useState([]);
+  const [boundaries, setBoundaries] = useState(null);
+
+  useEffect(() => {
+    axios
+      .get("http://127.0.0.1:8000/api/boundaries/districts")
+      .then((response) => setLevels(response.data.levels))
+      .catch((err) => console.warn("District boundaries not available.", err));
+  }, []);
+
+  // Only refetch when the zoom crosses into another simplification level;
+  // each level has its own URL so the browser cache serves repeat visits
+  const level = levels.filter((l) => l <= zoom).pop() ?? levels[0];
+
+  useEffect(() => {
+    if (level === undefined) return;
+    axios
+      .get(`http://127.0.0.1:8000/api/boundaries/districts/${level}`)
+      .then((response) => setBoundaries({ level, data: response.data }))
+      .catch((err) => console.warn("Error fetching district boundaries:", err));
+  }, [level]);
+
+  if (!boundaries) return null;
+  return (
+    <GeoJSON
+      key={boundaries.level}
+      data={boundaries.data}
+      style={{ color: "#b45309", weight: 1, fill: false }}
+    />
+  );
+};
+
 const PlotCropSelector = () => {
   const [plots, setPlots] = useState([]); // Store polygons (GeoJSON)
   const [selectedPlot, setSelectedPlot] = useState(null);
@@ -184,9 +222,11 @@ const PlotCropSelector = () => {
       errors.push("Temperature data is missing or invalid");
     }
 
-    // Validate rainfall
-    if (weatherData.rainfall === null || isNaN(Number(weatherData.rainfall))) {
-      errors.push("Rainfall data is missing or invalid");
+    // Validate rainfall (when missing, the backend reads it from its rainfall raster at the map centre)
+    if (weatherData.rainfall === null && mapCenter.length !== 2) {
+      errors.push("Rainfall data is missing");
+    } else if (weatherData.rainfall !== null && isNaN(Number(weatherData.rainfall))) {
+      errors.push("Rainfall data is invalid");
     }
 
     setError(errors.length > 0 ? errors.join(", ") : "");
@@ -228,7 +268,9 @@ const PlotCropSelector = () => {
       K: Number(nutrients.K),
       temperature: Number(weatherData.temperature),
       ph: Number(nutrients.pH),
-      rainfall: Number(weatherData.rainfall),
+      rainfall: weatherData.rainfall !== null ? Number(weatherData.rainfall) : undefined,
+      lat: mapCenter[0],
+      lon: mapCenter[1],
       soil_type: soilType || undefined,
       season: season || undefined,
       crop_type: cropType || undefined
@@ -461,6 +503,19 @@ const PlotCropSelector = () => {
               url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
               attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
             />
+            {/* Precomputed top-crop map; opacity shows model confidence */}
+            <LayersControl position="bottomright">
+              <LayersControl.Overlay checked name="Crop suitability">
+                <TileLayer
+                  url="http://127.0.0.1:8000/api/tiles/suitability/{z}/{x}/{y}.png"
+                  opacity={0.6}
+                  maxNativeZoom={12}
+                />
+              </LayersControl.Overlay>
+              <LayersControl.Overlay checked name="District boundaries">
+                <DistrictBoundaries />
+              </LayersControl.Overlay>
+            </LayersControl>
             <MapInitializer />
           </MapContainer>
         </div>